@@ -0,0 +1,334 @@
+"""Offline benchmarks. Run from the backend directory:
+
+    python -m bench all --sizes 1000,100000 --output bench.json
+    python -m bench make-db --tokens 100000 --db /tmp/bench/fomo-100000.db
+    python -m bench extract --count 500 [--browser] [--pages DIR]
+    python -m bench scrape --count 1000 [--browser]
+    python -m bench api --db /tmp/bench/fomo-100000.db
+    python -m bench record --urls urls.txt --out pages/
+
+Token pages come from a local HTTP server, either rendered from
+pages/token_template.html or replayed from pages saved with `record`.
+Every command prints one JSON document on stdout; logs go to stderr.
+backend modules bind their database on import, so each command that
+touches a database sets DATABASE_URL first and `all` runs every command
+in its own process. The api command drives the app through FastAPI's
+TestClient, which needs httpx installed. Run with SCRAPER_BLOCK_RESOURCES=0
+to compare the Selenium numbers against full page loads.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.synthetic import PageServer, load_saved_pages, load_tokens, token_page
+
+DEFAULT_SIZES = "1000,100000,1000000"
+API_REQUESTS = 50
+# (path, requests) per endpoint; full-table endpoints get fewer runs
+API_ENDPOINTS = (
+    ("/api/v1/stats", API_REQUESTS),
+    ("/api/v1/creators", 5),
+    ("/api/v1/creators?sort_by=total_market_cap", 5),
+    ("/api/v1/creators/top?limit=50", API_REQUESTS),
+    ("/api/v1/tokens?limit=100", API_REQUESTS),
+    ("/api/v1/tokens?limit=1000", API_REQUESTS),
+    ("/api/v1/tokens?sort_by=creation_date&order=desc&limit=100", API_REQUESTS),
+    ("/api/v1/tokens?min_market_cap=100000&limit=100", API_REQUESTS),
+    ("/api/v1/tokens?from=2025-06-01&to=2025-06-02&limit=100", API_REQUESTS),
+    ("/api/v1/tokens?ticker_prefix=TK12&limit=100", API_REQUESTS),
+    ("/api/v1/tokens/1/history", API_REQUESTS),
+    ("/api/v1/search?q=TK12", API_REQUESTS),
+    ("/api/v1/search?q=creator+4", API_REQUESTS),
+    ("/api/v1/stats/history", API_REQUESTS),
+    ("/api/v1/stats/history?bucket=month", API_REQUESTS),
+    ("/api/v1/tokens/export?format=ndjson", 3),
+)
+
+def _use_database(path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+
+def _summary(samples):
+    """Latency summary in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def _chrome_rss_bytes(driver):
+    """Resident memory of chromedriver and every Chrome process under it (Linux only)"""
+    parents = {}
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                parents[int(pid)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree = {driver.service.process.pid}
+    grew = True
+    while grew:
+        children = {pid for pid, parent in parents.items() if parent in tree} - tree
+        tree |= children
+        grew = bool(children)
+    total = 0
+    for pid in tree:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total += next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            continue
+    return total
+
+def _pages(args):
+    if args.pages:
+        return load_saved_pages(args.pages)
+    return None
+
+def make_db(args):
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    _use_database(args.db)
+    import models
+    from rollups import ensure_rollups
+    from risk import ensure_risk_scores
+
+    started = time.perf_counter()
+    load_tokens(models.engine, args.tokens, seed=args.seed)
+    loaded = time.perf_counter()
+    db = models.SessionLocal()
+    ensure_rollups(db)
+    ensure_risk_scores(db)
+    db.close()
+    return {
+        "db": args.db,
+        "tokens": args.tokens,
+        "load_seconds": loaded - started,
+        "rollup_seconds": time.perf_counter() - loaded,
+        "size_bytes": sum(os.path.getsize(path) for path in (args.db, args.db + "-wal") if os.path.exists(path)),
+    }
+
+def extract(args):
+    from http_extract import parse_token_html
+
+    saved = _pages(args)
+    pages = [saved[index % len(saved)] if saved else token_page(index) for index in range(args.count)]
+    samples = []
+    failures = 0
+    for index, html in enumerate(pages):
+        started = time.perf_counter()
+        token_info = parse_token_html(html, f"http://127.0.0.1/token/{index}")
+        samples.append(time.perf_counter() - started)
+        failures += token_info is None
+    result = {"http_parse": dict(_summary(samples), failures=failures)}
+
+    if args.browser:
+        from fomobiz_to_html import create_driver, extract_token_data
+
+        driver = create_driver()
+        try:
+            with PageServer(saved) as server:
+                loads = []
+                for mode in ("script", "elements"):
+                    samples = []
+                    for index in range(min(args.count, args.browser_count)):
+                        started = time.perf_counter()
+                        driver.get(server.url(index))
+                        loads.append(time.perf_counter() - started)
+                        started = time.perf_counter()
+                        extract_token_data(driver, server.url(index), mode=mode)
+                        samples.append(time.perf_counter() - started)
+                    result[f"browser_{mode}"] = _summary(samples)
+                result["browser_page_load"] = _summary(loads)
+                result["chrome_rss_bytes"] = _chrome_rss_bytes(driver)
+        finally:
+            driver.quit()
+    return result
+
+def scrape(args):
+    workdir = tempfile.mkdtemp(prefix="fomo-bench-")
+    _use_database(os.path.join(workdir, "scrape.db"))
+    from datetime import datetime
+    from driver_pool import DriverPool
+    from http_extract import fetch_all
+    from models import SessionLocal
+    from refresh_schedule import next_refresh_time
+    from scraper import scrape_token_page, token_values
+    from writer import BatchWriter
+
+    result = {}
+    with PageServer(_pages(args)) as server:
+        urls = [server.url(index) for index in range(args.count)]
+        db = SessionLocal()
+        started = time.perf_counter()
+        scraped = 0
+        with BatchWriter(db) as writer:
+            for url, token_info in fetch_all(urls):
+                if token_info is None:
+                    continue
+                values = token_values(token_info, url)
+                values['next_refresh_at'] = next_refresh_time(values['market_cap'], values['creation_date'], datetime.now())
+                writer.upsert_token(values)
+                scraped += 1
+        elapsed = time.perf_counter() - started
+        db.close()
+        result["http"] = {
+            "tokens": scraped,
+            "seconds": elapsed,
+            "tokens_per_second": scraped / elapsed if elapsed else None,
+            "write_rows_per_second": writer.total_rows / writer.total_seconds if writer.total_seconds else None,
+        }
+
+        if args.browser:
+            browser_urls = urls[:args.browser_count]
+            started = time.perf_counter()
+            with DriverPool(size=args.workers) as pool:
+                scraped = sum(token_info is not None for _, token_info in pool.run(browser_urls, scrape_token_page))
+            elapsed = time.perf_counter() - started
+            result["browser"] = {
+                "tokens": scraped,
+                "workers": args.workers,
+                "seconds": elapsed,
+                "tokens_per_second": scraped / elapsed if elapsed else None,
+            }
+    return result
+
+def api(args):
+    _use_database(args.db)
+    if not args.cache:
+        # Measure the handlers, not the response cache
+        os.environ["RESPONSE_CACHE_TTL"] = "0"
+    import warnings
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    from fastapi.testclient import TestClient
+    import main
+
+    result = {}
+    with TestClient(main.app) as client:
+        for path, requests in API_ENDPOINTS:
+            requests = max(1, int(requests * args.scale))
+            client.get(path)  # warm up connections and SQLite's page cache
+            samples = []
+            status = None
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get(path)
+                samples.append(time.perf_counter() - started)
+                status = response.status_code
+            result[path] = dict(_summary(samples), status=status, bytes=len(response.content))
+    return result
+
+def record(args):
+    """Save rendered token pages from the live site for offline replay"""
+    from fomobiz_to_html import create_driver
+    from scraper import scrape_token_page
+
+    os.makedirs(args.out, exist_ok=True)
+    urls = [line.strip() for line in open(args.urls) if line.strip()]
+    driver = create_driver()
+    saved = 0
+    try:
+        for index, url in enumerate(urls):
+            if scrape_token_page(driver, url) is None:
+                continue
+            with open(os.path.join(args.out, f"{index:05d}.html"), "w", encoding="utf-8") as f:
+                f.write(driver.page_source)
+            saved += 1
+    finally:
+        driver.quit()
+    return {"saved": saved, "out": args.out}
+
+def _run(*command):
+    output = subprocess.run(
+        [sys.executable, "-m", "bench", *command], check=True, stdout=subprocess.PIPE, text=True
+    ).stdout
+    return json.loads(output)
+
+def run_all(args):
+    os.makedirs(args.workdir, exist_ok=True)
+    pages = ["--pages", args.pages] if args.pages else []
+    browser = ["--browser"] if args.browser else []
+    results = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "extract": _run("extract", "--count", str(args.count), *pages, *browser),
+        "scrape": _run("scrape", "--count", str(args.count), *pages, *browser),
+        "databases": {},
+    }
+    for size in [int(size) for size in args.sizes.split(",") if size]:
+        path = os.path.join(args.workdir, f"fomo-{size}.db")
+        if args.reuse and os.path.exists(path):
+            database = {"db": path, "tokens": size, "reused": True}
+        else:
+            database = _run("make-db", "--tokens", str(size), "--db", path)
+        database["api"] = _run("api", "--db", path, "--scale", str(args.scale))
+        results["databases"][str(size)] = database
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline fomo.biz scraper and API benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_page_options(command):
+        command.add_argument("--count", type=int, default=500, help="token pages to process")
+        command.add_argument("--pages", help="directory of saved pages to replay instead of synthetic ones")
+        command.add_argument("--browser", action="store_true", help="also benchmark the Selenium path (needs Chrome)")
+        command.add_argument("--browser-count", type=int, default=50, help="pages for the Selenium path")
+        command.add_argument("--workers", type=int, default=3, help="drivers for the Selenium path")
+
+    command = commands.add_parser("all", help="run every benchmark and print one combined report")
+    add_page_options(command)
+    command.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated database sizes in tokens")
+    command.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "fomo-bench"))
+    command.add_argument("--reuse", action="store_true", help="reuse databases already in --workdir")
+    command.add_argument("--scale", type=float, default=1.0, help="multiplier for API requests per endpoint")
+    command.add_argument("--output", help="also write the report to this file")
+    command.set_defaults(handler=run_all)
+
+    command = commands.add_parser("make-db", help="generate a synthetic database")
+    command.add_argument("--tokens", type=int, required=True)
+    command.add_argument("--db", required=True)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(handler=make_db)
+
+    command = commands.add_parser("extract", help="per-token extraction time")
+    add_page_options(command)
+    command.set_defaults(handler=extract)
+
+    command = commands.add_parser("scrape", help="fetch, parse and write throughput")
+    add_page_options(command)
+    command.set_defaults(handler=scrape)
+
+    command = commands.add_parser("api", help="latency of each /api/v1 endpoint")
+    command.add_argument("--db", required=True)
+    command.add_argument("--cache", action="store_true", help="leave the response cache on")
+    command.add_argument("--scale", type=float, default=1.0, help="multiplier for requests per endpoint")
+    command.set_defaults(handler=api)
+
+    command = commands.add_parser("record", help="save live token pages for replay")
+    command.add_argument("--urls", required=True, help="file with one token URL per line")
+    command.add_argument("--out", required=True)
+    command.set_defaults(handler=record)
+
+    args = parser.parse_args()
+    result = args.handler(args)
+    report = json.dumps(result, indent=2, default=str)
+    if getattr(args, "output", None):
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Synthetic token pages and databases for the benchmarks"""
+import hashlib
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+TEMPLATE_PATH = os.path.join(PAGES_DIR, "token_template.html")
+CREATORS_PER_TOKEN = 0.2
+START_DATE = datetime(2025, 1, 1)
+
+def _address(seed):
+    return "0x" + hashlib.sha1(str(seed).encode()).hexdigest()[:40]
+
+def _market_cap(rng):
+    # Long tail: most tokens are tiny, a few are large
+    return round(rng.paretovariate(1.2) * 1000, 2)
+
+def _abbreviate(amount):
+    for suffix, size in (("B", 1e9), ("M", 1e6), ("K", 1e3)):
+        if amount >= size:
+            return f"${amount / size:.2f}{suffix}"
+    return f"${amount:,.2f}"
+
+def token_page(index, template=None):
+    """Render the page of synthetic token `index`; the same index always gives the same page"""
+    rng = random.Random(index)
+    template = template or Template(open(TEMPLATE_PATH, encoding="utf-8").read())
+    created = START_DATE + timedelta(seconds=rng.randrange(365 * 86400))
+    creator = _address(f"creator-{rng.randrange(max(1, int(index * CREATORS_PER_TOKEN) + 1))}")
+    return template.substitute(
+        name=f"Token {index}",
+        ticker=f"TK{index}",
+        address=_address(index),
+        creator=creator,
+        creator_name=creator[:8],
+        created=created.strftime("%d/%m/%Y, %H:%M:%S"),
+        age=f"{rng.randrange(1, 300)}d ago",
+        market_cap=_abbreviate(_market_cap(rng)),
+        supply=_abbreviate(1e9),
+        replies=rng.randrange(0, 500),
+        description=f"Synthetic token {index} for offline benchmarks.",
+    )
+
+def load_saved_pages(directory):
+    """HTML files saved from fomo.biz (see `python -m bench record`), in name order"""
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".html") and name != "token_template.html")
+    return [open(os.path.join(directory, name), encoding="utf-8").read() for name in names]
+
+class PageServer:
+    """Serves token pages on 127.0.0.1: /token/<n> returns saved page n (cycling) or synthetic page n"""
+
+    def __init__(self, saved_pages=None, port=0):
+        template = Template(open(TEMPLATE_PATH, encoding="utf-8").read())
+        saved_pages = saved_pages or []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                try:
+                    index = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+                except ValueError:
+                    self.send_error(404)
+                    return
+                html = saved_pages[index % len(saved_pages)] if saved_pages else token_page(index, template)
+                body = html.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def url(self, index):
+        return f"{self.base_url}/token/{index}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def _token_rows(count, seed):
+    rng = random.Random(seed)
+    creators = max(1, int(count * CREATORS_PER_TOKEN))
+    for index in range(1, count + 1):
+        creator = rng.randrange(creators)
+        yield {
+            'name': f"Token {index}",
+            'ticker': f"TK{index}",
+            'url': f"https://fomo.biz/token/{_address(index)}",
+            'logo_url': f"https://fomo.biz/media/{index}.png",
+            'creator_address': _address(f"creator-{creator}"),
+            'creator_name': f"creator {creator}",
+            'creator_avatar_url': f"https://fomo.biz/avatars/{creator}.png",
+            'creation_date': START_DATE + timedelta(seconds=rng.randrange(365 * 86400)),
+            'market_cap': _market_cap(rng),
+            'supply': 1e9,
+            'comments': rng.randrange(0, 500),
+            'description': f"Synthetic token {index} for offline benchmarks.",
+        }
+
+def load_tokens(engine, tokens, seed=0, batch_size=10000):
+    """Bulk insert `tokens` synthetic tokens and their scraped_urls rows.
+
+    `engine` must come from a models module imported with DATABASE_URL
+    pointing at the target database (see `python -m bench make-db`).
+    """
+    from sqlalchemy import insert
+    from models import ScrapedURL, Token
+
+    rows = _token_rows(tokens, seed)
+    while True:
+        batch = [row for _, row in zip(range(batch_size), rows)]
+        if not batch:
+            break
+        with engine.begin() as connection:
+            connection.execute(insert(Token), batch)
+            connection.execute(insert(ScrapedURL), [{'url': row['url']} for row in batch])
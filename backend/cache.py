@@ -0,0 +1,107 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+# Response headers worth replaying from the cache
+CACHED_HEADERS = ("content-type", "x-next-cursor")
+
+_data_version = 0
+_version_lock = threading.Lock()
+
+def data_version():
+    return _data_version
+
+def set_data_version(version):
+    """Called as committed scraper batches are seen; older cached responses become stale"""
+    global _data_version
+    with _version_lock:
+        _data_version = version
+
+class ResponseCache:
+    """LRU of rendered responses, each valid for `ttl` seconds and one data version"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            version, expires_at = entry[0], entry[1]
+            if version != data_version() or expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, headers, etag):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, body, headers, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def _etag(body):
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+def _not_modified(request, etag):
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Serve repeated GETs of the read API from memory and answer 304 to unchanged polls.
+
+    Entries are keyed on path and query string. Streaming endpoints opt out
+    through `excluded_paths`, and endpoints that set their own caching
+    headers through `excluded_prefixes`.
+    """
+
+    def __init__(self, app, prefix="/api/v1/", excluded_paths=(), excluded_prefixes=(), cache=None):
+        super().__init__(app)
+        self.prefix = prefix
+        self.excluded_paths = set(excluded_paths)
+        self.excluded_prefixes = tuple(excluded_prefixes)
+        self.cache = cache or ResponseCache()
+
+    async def dispatch(self, request, call_next):
+        path = request.url.path
+        if (request.method != "GET" or not path.startswith(self.prefix) or path in self.excluded_paths
+                or (self.excluded_prefixes and path.startswith(self.excluded_prefixes))):
+            return await call_next(request)
+
+        key = path + "?" + "&".join(sorted(request.url.query.split("&")))
+        entry = self.cache.get(key)
+        if entry is None:
+            version = data_version()
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+            etag = _etag(body)
+            self.cache.put(key, version, body, headers, etag)
+        else:
+            _, _, body, headers, etag = entry
+
+        headers = dict(headers, etag=etag)
+        # Clients may keep the body but must revalidate it with If-None-Match
+        headers["cache-control"] = "no-cache"
+        if _not_modified(request, etag):
+            headers.pop("content-type", None)
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, headers=headers)
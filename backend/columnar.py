@@ -0,0 +1,273 @@
+import logging
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import select
+from models import AsyncSessionLocal, Token
+from dbutil import chunks
+
+LOAD_BATCH_SIZE = 50000
+INITIAL_CAPACITY = 1024
+NAT = np.iinfo(np.int64).min  # NaT as seconds since the epoch
+CREATOR_SORT_KEYS = ("token_count", "total_market_cap", "first_token_date", "latest_token_date")
+
+class TokenColumns:
+    """The tokens table as NumPy arrays for the stats and creator endpoints.
+
+    One row per token ordered by id: id (8 bytes), market cap (8), creation
+    time (8, NaT when unknown), replies (4) and an integer-coded creator (4,
+    -1 when unknown), 32 bytes a token. Loaded once, then kept current from
+    the scrape event outbox. Events seen while the initial load runs are
+    replayed after it; applying an event is idempotent, so one that the load
+    already saw does no harm.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.size = 0
+        self.version = 0
+        self.ids = np.empty(INITIAL_CAPACITY, dtype=np.int64)
+        self.market_cap = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self.created = np.empty(INITIAL_CAPACITY, dtype="datetime64[s]")
+        self.comments = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self.creators = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self.creator_codes = {}
+        self.creator_addresses = []
+        self.creator_tokens = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.active_creators = 0
+        self.total_market_cap = 0.0
+        self._pending = []
+        self._history = None
+        self._groups = None
+
+    def _grow(self, size):
+        capacity = len(self.ids)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("ids", "market_cap", "created", "comments", "creators"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _creator_code(self, address):
+        if not address:
+            return -1
+        code = self.creator_codes.get(address)
+        if code is None:
+            code = self.creator_codes[address] = len(self.creator_codes)
+            self.creator_addresses.append(address)
+            if code >= len(self.creator_tokens):
+                self.creator_tokens = np.concatenate([self.creator_tokens, np.zeros_like(self.creator_tokens)])
+        return code
+
+    def _count_creators(self, codes, delta):
+        codes = codes[codes >= 0]
+        before = np.count_nonzero(self.creator_tokens[np.unique(codes)])
+        np.add.at(self.creator_tokens, codes, delta)
+        self.active_creators += np.count_nonzero(self.creator_tokens[np.unique(codes)]) - before
+
+    def _row_index(self, token_ids):
+        """Positions of token_ids in the columns, -1 for ids not loaded"""
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids[:self.size], token_ids)
+        found = positions < self.size
+        found[found] = self.ids[positions[found]] == token_ids[found]
+        return np.where(found, positions, -1)
+
+    def upsert(self, rows):
+        """Add or overwrite (id, market_cap, creation_date, comments, creator_address) rows"""
+        if not rows:
+            return
+        rows = sorted(rows)
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        market_cap = np.fromiter((row[1] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+        created = np.array([row[2] for row in rows], dtype="datetime64[s]")
+        comments = np.fromiter((row[3] or 0 for row in rows), dtype=np.int32, count=len(rows))
+        creators = np.fromiter((self._creator_code(row[4]) for row in rows), dtype=np.int32, count=len(rows))
+
+        positions = self._row_index(ids)
+        existing = positions >= 0
+        if existing.any():
+            at = positions[existing]
+            self.total_market_cap += float(market_cap[existing].sum() - self.market_cap[at].sum())
+            self._count_creators(self.creators[at], -1)
+            self._count_creators(creators[existing], 1)
+            self.market_cap[at] = market_cap[existing]
+            self.created[at] = created[existing]
+            self.comments[at] = comments[existing]
+            self.creators[at] = creators[existing]
+
+        new = ~existing
+        if new.any():
+            if self.size and ids[new][0] < self.ids[self.size - 1]:
+                # Ids are assigned in increasing order, so this only happens
+                # when the newest token was deleted and its id reused.
+                order = np.argsort(np.concatenate([self.ids[:self.size], ids[new]]), kind="stable")
+                self._append(ids[new], market_cap[new], created[new], comments[new], creators[new])
+                for name in ("ids", "market_cap", "created", "comments", "creators"):
+                    column = getattr(self, name)
+                    column[:self.size] = column[:self.size][order]
+            else:
+                self._append(ids[new], market_cap[new], created[new], comments[new], creators[new])
+        self._changed()
+
+    def _append(self, ids, market_cap, created, comments, creators):
+        start, end = self.size, self.size + len(ids)
+        self._grow(end)
+        self.ids[start:end] = ids
+        self.market_cap[start:end] = market_cap
+        self.created[start:end] = created
+        self.comments[start:end] = comments
+        self.creators[start:end] = creators
+        self.size = end
+        self.total_market_cap += float(market_cap.sum())
+        self._count_creators(creators, 1)
+
+    def update_market_caps(self, updates):
+        """Apply (id, market_cap, comments) refreshes to loaded tokens"""
+        if not updates:
+            return
+        positions = self._row_index([token_id for token_id, _, _ in updates])
+        found = positions >= 0
+        if not found.any():
+            return
+        at = positions[found]
+        market_cap = np.array([market_cap or 0.0 for _, market_cap, _ in updates], dtype=np.float64)[found]
+        # A position refreshed twice in one batch keeps its last value
+        at, last = np.unique(at[::-1], return_index=True)
+        market_cap = market_cap[::-1][last]
+        self.total_market_cap += float(market_cap.sum() - self.market_cap[at].sum())
+        self.market_cap[at] = market_cap
+        comments = np.array([-1 if comments is None else comments for _, _, comments in updates], dtype=np.int32)[found][::-1][last]
+        known = comments >= 0
+        self.comments[at[known]] = comments[known]
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._history = None
+        self._groups = None
+
+    def stats(self, now):
+        created = self.created[:self.size]
+        return {
+            "total_creators": int(self.active_creators),
+            "total_tokens": int(self.size),
+            "total_market_cap": float(self.total_market_cap) if self.size else None,
+            "new_today": int(np.count_nonzero(created >= np.datetime64(now - timedelta(hours=24), "s"))),
+        }
+
+    def creator_first_seen(self):
+        """Earliest creation time per creator code (NaT if none known)"""
+        first = np.full(len(self.creator_codes), np.datetime64("NaT"), dtype="datetime64[s]")
+        known = self.creators[:self.size] >= 0
+        # fmin skips NaT, so tokens without a date do not hide dated ones
+        np.fmin.at(first, self.creators[:self.size][known], self.created[:self.size][known])
+        return first
+
+    def creator_groups(self):
+        """Per-creator aggregates over creators with tokens, as a dict of arrays.
+
+        Keys are code plus the CREATOR_SORT_KEYS and total_replies; dates
+        are int64 epoch seconds with NAT for unknown, which sorts like SQL
+        NULLs on SQLite.
+        """
+        if self._groups is None:
+            count = len(self.creator_codes)
+            codes = self.creators[:self.size]
+            known = codes >= 0
+            codes = codes[known]
+            created = self.created[:self.size][known].view(np.int64)
+            # ufunc.at on int64 is far faster than on datetime64
+            first = np.full(count, np.iinfo(np.int64).max)
+            np.minimum.at(first, codes, np.where(created == NAT, np.iinfo(np.int64).max, created))
+            first[first == np.iinfo(np.int64).max] = NAT
+            latest = np.full(count, NAT)
+            np.maximum.at(latest, codes, created)
+            active = np.flatnonzero(self.creator_tokens[:count])
+            self._groups = {
+                "code": active,
+                "token_count": self.creator_tokens[active],
+                "total_market_cap": np.bincount(codes, weights=self.market_cap[:self.size][known], minlength=count)[active],
+                "total_replies": np.bincount(codes, weights=self.comments[:self.size][known], minlength=count)[active].astype(np.int64),
+                "first_token_date": first[active],
+                "latest_token_date": latest[active],
+            }
+        return self._groups
+
+    def creator_rows(self, sort_by="token_count", descending=True):
+        """(address, token_count, total_market_cap, total_replies, first, latest) per creator, sorted on `sort_by`"""
+        groups = self.creator_groups()
+        order = np.argsort(groups[sort_by], kind="stable")
+        if descending:
+            order = order[::-1]
+        dates = [groups[key][order].astype("datetime64[s]").tolist() for key in ("first_token_date", "latest_token_date")]
+        return list(zip(
+            [self.creator_addresses[code] for code in groups["code"][order].tolist()],
+            groups["token_count"][order].tolist(),
+            groups["total_market_cap"][order].tolist(),
+            groups["total_replies"][order].tolist(),
+            *dates,
+        ))
+
+    def daily_history(self):
+        """(days, new_tokens, market_cap, new_creators) arrays for days with new tokens"""
+        if self._history is None:
+            created = self.created[:self.size]
+            dated = ~np.isnat(created)
+            if not dated.any():
+                empty = np.array([], dtype="datetime64[D]")
+                self._history = (empty, np.array([], dtype=np.int64), np.array([]), np.array([], dtype=np.int64))
+                return self._history
+            days = created[dated].astype("datetime64[D]")
+            first_day = days.min()
+            offsets = (days - first_day).astype(np.int64)
+            new_tokens = np.bincount(offsets)
+            market_cap = np.bincount(offsets, weights=self.market_cap[:self.size][dated], minlength=len(new_tokens))
+
+            first_seen = self.creator_first_seen()
+            first_seen = first_seen[~np.isnat(first_seen)].astype("datetime64[D]")
+            new_creators = np.bincount((first_seen - first_day).astype(np.int64), minlength=len(new_tokens))
+
+            active = np.flatnonzero(new_tokens)
+            self._history = (first_day + active, new_tokens[active], market_cap[active], new_creators[active])
+        return self._history
+
+    async def load(self):
+        """Read the whole tokens table in id order, then replay events that arrived meanwhile"""
+        async with AsyncSessionLocal() as db:
+            rows = await db.stream(select(
+                Token.id, Token.market_cap, Token.creation_date, Token.comments, Token.creator_address
+            ).order_by(Token.id).execution_options(yield_per=LOAD_BATCH_SIZE))
+            async for batch in rows.partitions(LOAD_BATCH_SIZE):
+                self.upsert([tuple(row) for row in batch])
+        self.ready = True
+        pending, self._pending = self._pending, []
+        await self.apply_events(pending)
+        logging.info(f"Loaded {self.size} tokens and {self.active_creators} creators into columns")
+
+    async def apply_events(self, events):
+        """Outbox listener: new tokens are read back by url, refreshes applied in place"""
+        if not self.ready:
+            self._pending.extend(events)
+            return
+        if any(event.get('type') == 'resync' for event in events):
+            # Changes were missed; reading the table again catches up
+            await self.load()
+            return
+        urls = {event['token']['url'] for event in events if event.get('type') == 'new_token'}
+        if urls:
+            async with AsyncSessionLocal() as db:
+                for batch in chunks(urls):
+                    rows = (await db.execute(select(
+                        Token.id, Token.market_cap, Token.creation_date, Token.comments, Token.creator_address
+                    ).filter(Token.url.in_(batch)))).all()
+                    self.upsert([tuple(row) for row in rows])
+        self.update_market_caps([
+            (event['id'], event['market_cap'], event.get('comments'))
+            for event in events if event.get('type') == 'market_cap'
+        ])
+
+token_columns = TokenColumns()
@@ -0,0 +1,14 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+# SQLite caps bound parameters per statement, so IN (...) lists are chunked.
+CHUNK_SIZE = 500
+
+def chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def upsert_insert(db, table):
+    """INSERT for `table` in the session's dialect, which has on_conflict_do_update/nothing"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
@@ -0,0 +1,148 @@
+import logging
+import os
+import queue
+import threading
+import time
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from fomobiz_to_html import create_driver
+from metrics import DRIVER_RESTARTS, SCRAPE_FAILURES, SCRAPE_RETRIES
+
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "3"))
+PAGES_PER_DRIVER = int(os.getenv("SCRAPER_PAGES_PER_DRIVER", "200"))
+SCRAPE_ATTEMPTS = 2
+RETRY_DELAY = 3
+
+_STOP = object()
+
+class DriverPool:
+    """A fixed set of worker threads, each owning one long-lived Chrome driver.
+
+    URLs are pulled from a shared queue and results are handed back to the
+    caller, which stays the only thread writing to the database. A driver is
+    replaced after `pages_per_driver` pages, when it fails a health check, or
+    when it raises a WebDriverException. `reset` abandons a batch the
+    caller stopped consuming, so its leftovers cannot leak into the next.
+    """
+
+    def __init__(self, size=SCRAPER_WORKERS, pages_per_driver=PAGES_PER_DRIVER, driver_factory=create_driver):
+        self.size = max(1, size)
+        self.pages_per_driver = pages_per_driver
+        self.driver_factory = driver_factory
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._threads = []
+        self._generation = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        for index in range(self.size):
+            thread = threading.Thread(target=self._work, args=(index,), name=f"scraper-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _drop_queued(self):
+        while True:
+            try:
+                self._tasks.get_nowait()
+            except queue.Empty:
+                break
+
+    def close(self):
+        # Drop work that was never picked up so workers stop promptly
+        self._drop_queued()
+        for _ in self._threads:
+            self._tasks.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def run(self, urls, task):
+        """Run task(driver, url) for every URL and yield (url, result) as they finish.
+
+        A result of None means every attempt failed or returned no data.
+        """
+        urls = list(urls)
+        generation = self._generation
+        for url in urls:
+            self._tasks.put((generation, url, task))
+        received = 0
+        while received < len(urls):
+            result_generation, url, result = self._results.get()
+            if result_generation != generation:
+                # Finished late for a batch that was reset
+                continue
+            received += 1
+            yield url, result
+
+    def reset(self):
+        """Forget the current batch: queued URLs are dropped and results still in flight ignored"""
+        self._generation += 1
+        self._drop_queued()
+
+    def _healthy(self, driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except WebDriverException:
+            return False
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _work(self, index):
+        driver = None
+        pages = 0
+        while True:
+            item = self._tasks.get()
+            if item is _STOP:
+                break
+            generation, url, task = item
+            if generation != self._generation:
+                continue
+            result = None
+
+            for attempt in range(SCRAPE_ATTEMPTS):
+                if driver is not None and (pages >= self.pages_per_driver or not self._healthy(driver)):
+                    logging.info(f"Worker {index} recycling driver after {pages} pages")
+                    DRIVER_RESTARTS.inc(reason="page_limit" if pages >= self.pages_per_driver else "unhealthy")
+                    self._quit(driver)
+                    driver = None
+                try:
+                    if driver is None:
+                        driver = self.driver_factory()
+                        pages = 0
+                    pages += 1
+                    result = task(driver, url)
+                    if result is not None:
+                        break
+                    logging.warning(f"[Retry {attempt + 1}/{SCRAPE_ATTEMPTS}] incomplete data for {url}, retrying after delay...")
+                    SCRAPE_FAILURES.inc(cause="incomplete")
+                except TimeoutException as e:
+                    logging.error(f"Timed out scraping {url}: {e}")
+                    SCRAPE_FAILURES.inc(cause="timeout")
+                except WebDriverException as e:
+                    logging.error(f"Worker {index} driver error on {url}: {e}")
+                    SCRAPE_FAILURES.inc(cause="webdriver")
+                    if driver is not None:
+                        DRIVER_RESTARTS.inc(reason="crash")
+                        self._quit(driver)
+                    driver = None
+                except Exception as e:
+                    logging.error(f"Error scraping {url}: {e}")
+                    SCRAPE_FAILURES.inc(cause="error")
+                if attempt + 1 < SCRAPE_ATTEMPTS:
+                    SCRAPE_RETRIES.inc()
+                    time.sleep(RETRY_DELAY)
+
+            self._results.put((generation, url, result))
+
+        if driver is not None:
+            self._quit(driver)
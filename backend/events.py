@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from models import AsyncSessionLocal, ScrapeEvent
+from cache import set_data_version
+from normalize import format_datetime
+
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "256"))
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "1"))
+EVENT_POLL_BATCH = 1000
+EVENT_RETENTION = timedelta(hours=1)
+# A reconnecting stream client further behind than this is told to resync instead
+EVENT_REPLAY_LIMIT = int(os.getenv("EVENT_REPLAY_LIMIT", "1000"))
+
+class Subscriber:
+    def __init__(self, loop, buffer_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = 0
+
+    def offer(self, event):
+        # Runs on the subscriber's event loop. A client that cannot keep up
+        # loses events instead of growing the buffer; it is told to resync.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+class EventBroker:
+    """In-process pub/sub from the outbox follower to event stream clients"""
+
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = Subscriber(asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event_id, event):
+        """Thread-safe; hands the (outbox id, event) pair to every subscriber's loop without blocking"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, (event_id, event))
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscriber)
+
+broker = EventBroker()
+
+def commit_events(inserts, updates):
+    """Events describing a committed writer batch: created tokens (rows with their id) and market cap changes"""
+    events = []
+    for row in inserts:
+        token = {key: value for key, value in row.items() if key not in ('next_refresh_at', 'last_refreshed_at')}
+        token['creation_date'] = format_datetime(row.get('creation_date'))
+        token['created_at'] = token['creation_date']
+        events.append({
+            'type': 'new_token',
+            'creator_address': row.get('creator_address'),
+            'creator_name': row.get('creator_name'),
+            'token': token,
+        })
+    for row in updates:
+        if 'market_cap' in row:
+            events.append({
+                'type': 'market_cap',
+                'id': row['id'],
+                'creator_address': row.get('creator_address'),
+                'market_cap': row['market_cap'],
+                'comments': row.get('comments'),
+            })
+    return events
+
+def record_events(db, inserts, updates):
+    """Append a batch's events to the outbox inside the writer's transaction"""
+    now = datetime.now()
+    rows = [{'created_at': now, 'payload': json.dumps(event, default=str)} for event in commit_events(inserts, updates)]
+    if rows:
+        db.execute(insert(ScrapeEvent), rows)
+    return len(rows)
+
+def record_change(db, event):
+    """Append an event for a change made outside the writer, so caches still see it"""
+    db.execute(insert(ScrapeEvent), [{'created_at': datetime.now(), 'payload': json.dumps(event, default=str)}])
+
+def prune_events(db, older_than=EVENT_RETENTION):
+    """Delete events past retention, always keeping the newest.
+
+    Outbox tables created before AUTOINCREMENT reuse the ids of deleted
+    rows, and the newest row is what keeps the next id past every id a
+    follower has already seen.
+    """
+    newest = db.scalar(select(func.max(ScrapeEvent.id)))
+    if newest is None:
+        return 0
+    deleted = db.query(ScrapeEvent).filter(
+        ScrapeEvent.created_at < datetime.now() - older_than, ScrapeEvent.id < newest
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+async def latest_event_id():
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.coalesce(func.max(ScrapeEvent.id), 0)))
+
+async def events_after(after_id, limit=EVENT_REPLAY_LIMIT):
+    """(id, event) pairs of the outbox rows after `after_id`.
+
+    None when some of them were already pruned or there are more than
+    `limit`, in which case the caller should refetch instead of replaying.
+    """
+    async with AsyncSessionLocal() as db:
+        oldest, newest = (await db.execute(select(func.min(ScrapeEvent.id), func.max(ScrapeEvent.id)))).one()
+        if oldest is not None and oldest > after_id + 1:
+            return None
+        if (newest or 0) < after_id:
+            # The outbox was emptied and its ids started over
+            return None
+        rows = (await db.execute(
+            select(ScrapeEvent.id, ScrapeEvent.payload)
+            .filter(ScrapeEvent.id > after_id)
+            .order_by(ScrapeEvent.id)
+            .limit(limit + 1)
+        )).all()
+    if len(rows) > limit:
+        return None
+    return [(event_id, json.loads(payload)) for event_id, payload in rows]
+
+async def follow_events(poll_seconds=EVENT_POLL_SECONDS, listeners=(), after_id=None):
+    """Tail the outbox written by scraper workers in any process.
+
+    Each row after `after_id` (the newest row if None) is published to this
+    process's stream clients and handed to `listeners` (async callables
+    taking a list of events), and the newest id becomes the response
+    cache's data version. Should the outbox ids ever go backwards, the
+    follower starts over from the newest row and hands everyone a resync
+    event, since what happened in between cannot be replayed.
+    """
+    last_id = await latest_event_id() if after_id is None else after_id
+    set_data_version(last_id)
+    while True:
+        await asyncio.sleep(poll_seconds)
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    select(ScrapeEvent.id, ScrapeEvent.payload)
+                    .filter(ScrapeEvent.id > last_id)
+                    .order_by(ScrapeEvent.id)
+                    .limit(EVENT_POLL_BATCH)
+                )).all()
+                newest = None if rows else await db.scalar(select(func.coalesce(func.max(ScrapeEvent.id), 0)))
+        except Exception as e:
+            logging.error(f"Failed to read scrape events: {e}")
+            continue
+        if newest is not None and newest < last_id:
+            logging.warning(f"Scrape event ids went back from {last_id} to {newest}; resyncing")
+            last_id = newest
+            rows = [(newest, json.dumps({'type': 'resync'}))]
+        events = []
+        for event_id, payload in rows:
+            event = json.loads(payload)
+            broker.publish(event_id, event)
+            events.append(event)
+            last_id = event_id
+        if rows:
+            for listener in listeners:
+                try:
+                    await listener(events)
+                except Exception as e:
+                    logging.error(f"Scrape event listener failed: {e}")
+            set_data_version(last_id)
@@ -1,7 +1,9 @@
 import csv
+import fcntl
 import json
 import time
 import os
+import tempfile
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -10,6 +12,101 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from normalize import parse_amount, parse_count
+from metrics import EXTRACT_SECONDS, MISSING_FIELDS
+
+# Column layout of fomo_tokens_comprehensive.csv, shared with the API export
+TOKEN_CSV_FIELDS = ['name', 'ticker', 'creator_name', 'creator_address', 'creator_link', 
+                    'creator_title', 'creator_avatar_url', 'logo_url', 'market_cap', 
+                    'supply', 'replies', 'creation_date', 'creation_date_raw', 'age', 
+                    'description', 'url', 'error']
+
+# CSS selectors for the token page. fomo.biz hashes its class names on each
+# redeploy, so they can be overridden from a JSON file named by FOMO_SELECTORS.
+SELECTORS = {
+    'container': '._tokenInfoContainer_z5b78_1',
+    'name': '._tokenName_z5b78_38',
+    'ticker': '._ticker_z5b78_46',
+    'logo': 'img._tokenMedia_z5b78_23',
+    'creator': '._creatorAddress_z5b78_60',
+    'avatar': '._userAvatar_z5b78_174 img',
+    'meta_time': '._metaInfo_z5b78_51 span[title]',
+    'stat_item': '._statItem_z5b78_81',
+    'stat_label': '._statLabel_z5b78_90',
+    'stat_value': '._statValue_z5b78_97',
+    'description': '._tokenDescription_z5b78_105',
+}
+if os.getenv("FOMO_SELECTORS"):
+    with open(os.getenv("FOMO_SELECTORS"), "r") as file:
+        SELECTORS.update(json.load(file))
+
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "script")
+
+# Reads every field in one round-trip; arguments[0] is SELECTORS. Missing
+# elements come back as null instead of costing a WebDriverWait timeout.
+EXTRACT_FIELDS_SCRIPT = """
+const selectors = arguments[0];
+const find = (selector, root) => (root || document).querySelector(selector);
+const text = (element) => element ? element.innerText.trim() : null;
+const creator = find(selectors.creator);
+const logo = find(selectors.logo);
+const avatar = find(selectors.avatar);
+return {
+    full_name: text(find(selectors.name)),
+    ticker: text(find(selectors.ticker)),
+    logo_url: logo ? logo.src : null,
+    creator_href: creator ? creator.href : null,
+    creator_text: text(creator),
+    creator_title: creator ? creator.getAttribute('title') : null,
+    avatar_url: avatar ? avatar.src : null,
+    times: Array.from(document.querySelectorAll(selectors.meta_time)).map(
+        (element) => [element.getAttribute('title'), text(element)]
+    ),
+    stats: Array.from(document.querySelectorAll(selectors.stat_item)).map(
+        (item) => [text(find(selectors.stat_label, item)), text(find(selectors.stat_value, item))]
+    ),
+    description: text(find(selectors.description)),
+};
+"""
+
+# Scraping only reads text and image src attributes, so pages load without
+# images, media, fonts or analytics. SCRAPER_BLOCK_RESOURCES=0 restores full
+# page loads, e.g. to compare with `python -m bench scrape --browser`.
+BLOCK_RESOURCES = os.getenv("SCRAPER_BLOCK_RESOURCES", "1") == "1"
+BLOCKED_URL_PATTERNS = [
+    "*.mp4", "*.webm", "*.mov", "*.m3u8", "*.mp3", "*.ogg",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*segment.io*",
+    "*mixpanel.com*", "*plausible.io*", "*sentry.io*",
+] + [pattern for pattern in os.getenv("SCRAPER_BLOCKED_URLS", "").split(",") if pattern]
+CONTENT_SETTINGS_BLOCKED = 2
+# Chrome profiles that outlive a driver, so recycled drivers start with the
+# site's scripts already cached. Empty disables them.
+PROFILE_DIR = os.getenv("SCRAPER_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "fomo-chrome-profiles"))
+PROFILE_CACHE_BYTES = 100 * 1024 * 1024
+
+def _claim_profile_dir():
+    """Lock the first profile slot no other driver holds; Chrome cannot share a user data dir"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slot = 0
+    while True:
+        path = os.path.join(PROFILE_DIR, f"profile-{slot}")
+        lock = open(path + ".lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            slot += 1
+            continue
+        # Whoever held this slot before is gone; a lock left by a crashed
+        # Chrome (or one from another container) would make Chrome refuse it
+        for name in ("SingletonLock", "SingletonCookie", "SingletonSocket"):
+            try:
+                os.unlink(os.path.join(path, name))
+            except FileNotFoundError:
+                pass
+        return path, lock
 
 def create_driver():
     """Create a new Chrome driver instance"""
@@ -20,13 +117,73 @@ def create_driver():
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--window-size=1920,1080")
     options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(
-        service=Service("/usr/local/bin/chromedriver"),
-        options=options
-    )
+    if BLOCK_RESOURCES:
+        # driver.get returns at DOMContentLoaded; callers wait for the elements they read
+        options.page_load_strategy = "eager"
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": CONTENT_SETTINGS_BLOCKED,
+            "profile.managed_default_content_settings.media_stream": CONTENT_SETTINGS_BLOCKED,
+            "profile.managed_default_content_settings.notifications": CONTENT_SETTINGS_BLOCKED,
+        })
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--mute-audio")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--disable-features=Translate,OptimizationHints,MediaRouter")
+
+    lock = None
+    if PROFILE_DIR:
+        profile, lock = _claim_profile_dir()
+        options.add_argument(f"--user-data-dir={profile}")
+        options.add_argument(f"--disk-cache-size={PROFILE_CACHE_BYTES}")
+
+    try:
+        driver = webdriver.Chrome(
+            service=Service("/usr/local/bin/chromedriver"),
+            options=options
+        )
+    except Exception:
+        if lock is not None:
+            lock.close()
+        raise
+
+    if lock is not None:
+        # The slot is free again once this Chrome has exited
+        quit = driver.quit
+
+        def quit_and_release():
+            try:
+                quit()
+            finally:
+                lock.close()
+
+        driver.quit = quit_and_release
+
+    if BLOCK_RESOURCES:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception:
+            driver.quit()
+            raise
     return driver
 
+def split_name_ticker(full_name):
+    """Split a 'Name (TICKER)' heading into its name and ticker"""
+    name_part = full_name.split('(')[0].strip()
+    ticker_part = full_name.split('(')[1].replace(')', '').strip()
+    return name_part, ticker_part
+
+def parse_creation_time(creation_time_str):
+    """Normalize the page's 'dd/mm/YYYY, HH:MM:SS' title to 'YYYY-mm-dd HH:MM:SS'"""
+    if not creation_time_str or '/' not in creation_time_str:
+        return None
+    try:
+        return datetime.strptime(creation_time_str, "%d/%m/%Y, %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
 def safe_find_element(driver, by, value, wait_time=5):
     """Safely find an element with timeout"""
     try:
@@ -37,104 +194,131 @@ def safe_find_element(driver, by, value, wait_time=5):
     except (TimeoutException, NoSuchElementException):
         return None
 
-def extract_token_data(driver, url):
-    """Extract comprehensive token data from the page"""
+def _get_text(element):
+    return element.text.strip() if element else None
+
+def _get_attribute(element, name):
+    return element.get_attribute(name) if element else None
+
+def _find_optional(root, selector):
+    # find_elements returns immediately when nothing matches instead of waiting
+    elements = root.find_elements(By.CSS_SELECTOR, selector)
+    return elements[0] if elements else None
+
+def _read_fields_elements(driver, selectors):
+    """Collect raw fields with one WebDriver call per element"""
+    creator = safe_find_element(driver, By.CSS_SELECTOR, selectors['creator'])
+    return {
+        'full_name': _get_text(safe_find_element(driver, By.CSS_SELECTOR, selectors['name'])),
+        'ticker': _get_text(_find_optional(driver, selectors['ticker'])),
+        'logo_url': _get_attribute(safe_find_element(driver, By.CSS_SELECTOR, selectors['logo']), 'src'),
+        'creator_href': _get_attribute(creator, 'href'),
+        'creator_text': _get_text(creator),
+        'creator_title': _get_attribute(creator, 'title'),
+        'avatar_url': _get_attribute(safe_find_element(driver, By.CSS_SELECTOR, selectors['avatar']), 'src'),
+        'times': [
+            [element.get_attribute('title'), element.text.strip()]
+            for element in driver.find_elements(By.CSS_SELECTOR, selectors['meta_time'])
+        ],
+        'stats': [
+            [_get_text(_find_optional(item, selectors['stat_label'])), _get_text(_find_optional(item, selectors['stat_value']))]
+            for item in driver.find_elements(By.CSS_SELECTOR, selectors['stat_item'])
+        ],
+        'description': _get_text(safe_find_element(driver, By.CSS_SELECTOR, selectors['description'])),
+    }
+
+def _read_fields_script(driver, selectors):
+    """Collect raw fields in a single execute_script round-trip"""
+    return driver.execute_script(EXTRACT_FIELDS_SCRIPT, selectors)
+
+def build_token_info(fields, url):
+    """Turn raw page fields into the token dict written to the CSV and database"""
     token_info = {'url': url}
-    
+
+    full_name = fields.get('full_name')
+    if full_name:
+        if '(' in full_name and ')' in full_name:
+            token_info['name'], token_info['ticker'] = split_name_ticker(full_name)
+        else:
+            token_info['name'] = full_name
+            token_info['ticker'] = fields.get('ticker') or 'Unknown'
+    else:
+        token_info['name'] = 'Unknown'
+        token_info['ticker'] = 'Unknown'
+
+    token_info['logo_url'] = fields.get('logo_url') or 'Unknown'
+
+    creator_href = fields.get('creator_href')
+    if creator_href:
+        token_info['creator_link'] = creator_href
+        token_info['creator_address'] = creator_href.rstrip('/').split('/')[-1]
+        token_info['creator_name'] = fields.get('creator_text') or ''
+        token_info['creator_title'] = fields.get('creator_title') or 'Unknown'
+    else:
+        token_info['creator_address'] = 'Unknown'
+        token_info['creator_link'] = 'Unknown'
+        token_info['creator_name'] = 'Unknown'
+        token_info['creator_title'] = 'Unknown'
+
+    token_info['creator_avatar_url'] = fields.get('avatar_url') or 'Unknown'
+
+    token_info['creation_date'] = 'Unknown'
+    token_info['creation_date_raw'] = 'Unknown'
+    token_info['age'] = 'Unknown'
+    for creation_time_str, age in fields.get('times') or []:
+        creation_date = parse_creation_time(creation_time_str)
+        if creation_date:
+            token_info['creation_date'] = creation_date
+            token_info['creation_date_raw'] = creation_time_str
+            token_info['age'] = age or 'Unknown'
+            break
+
+    for label, value in fields.get('stats') or []:
+        if not label or value is None:
+            continue
+        label = label.lower()
+        if label == 'mc':
+            token_info['market_cap'] = value
+        elif label == 'supply':
+            token_info['supply'] = value
+        elif label == 'replies':
+            token_info['replies'] = value
+
+    token_info['description'] = fields.get('description') or 'Unknown'
+
+    # A jump in any of these usually means fomo.biz changed its markup
+    for field in ('name', 'ticker', 'creator_address', 'creation_date', 'market_cap'):
+        if token_info.get(field, 'Unknown') == 'Unknown':
+            MISSING_FIELDS.inc(field=field)
+    return token_info
+
+def extract_token_data(driver, url, mode=None):
+    """Extract comprehensive token data from the page
+
+    mode 'script' (the default) reads every field with one execute_script
+    call; 'elements' uses one WebDriver call per element.
+    """
+    mode = mode or EXTRACTION_MODE
     try:
         # Wait for the main container to load
         wait = WebDriverWait(driver, 10)
-        wait.until(EC.presence_of_element_located((By.CLASS_NAME, '_tokenInfoContainer_z5b78_1')))
-        
-        # Extract token name and ticker
-        token_name_element = safe_find_element(driver, By.CLASS_NAME, '_tokenName_z5b78_38')
-        if token_name_element:
-            full_name = token_name_element.text
-            # Extract name and ticker separately
-            if '(' in full_name and ')' in full_name:
-                name_part = full_name.split('(')[0].strip()
-                ticker_part = full_name.split('(')[1].replace(')', '').strip()
-                token_info['name'] = name_part
-                token_info['ticker'] = ticker_part
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORS['container'])))
+
+        with EXTRACT_SECONDS.time(mode=mode):
+            if mode == 'elements':
+                fields = _read_fields_elements(driver, SELECTORS)
             else:
-                token_info['name'] = full_name
-                ticker_element = safe_find_element(driver, By.CLASS_NAME, '_ticker_z5b78_46')
-                token_info['ticker'] = ticker_element.text.strip() if ticker_element else 'Unknown'
-        else:
-            token_info['name'] = 'Unknown'
-            token_info['ticker'] = 'Unknown'
-        
-        # Extract logo URL
-        logo_element = safe_find_element(driver, By.CSS_SELECTOR, 'img._tokenMedia_z5b78_23')
-        token_info['logo_url'] = logo_element.get_attribute('src') if logo_element else 'Unknown'
-        
-        # Extract creator information
-        creator_element = safe_find_element(driver, By.CLASS_NAME, '_creatorAddress_z5b78_60')
-        if creator_element:
-            token_info['creator_link'] = creator_element.get_attribute('href')
-            token_info['creator_address'] = token_info['creator_link'].split('/')[-1]
-            token_info['creator_name'] = creator_element.text.strip()
-            
-            # Get creator title attribute for full info
-            creator_title = creator_element.get_attribute('title')
-            if creator_title:
-                token_info['creator_title'] = creator_title
-        else:
-            token_info['creator_address'] = 'Unknown'
-            token_info['creator_link'] = 'Unknown'
-            token_info['creator_name'] = 'Unknown'
-            token_info['creator_title'] = 'Unknown'
-        
-        # Extract creator avatar
-        creator_avatar_element = safe_find_element(driver, By.CSS_SELECTOR, '._userAvatar_z5b78_174 img')
-        token_info['creator_avatar_url'] = creator_avatar_element.get_attribute('src') if creator_avatar_element else 'Unknown'
-        
-        # Extract creation time
-        time_elements = driver.find_elements(By.CSS_SELECTOR, '._metaInfo_z5b78_51 span[title]')
-        for time_element in time_elements:
-            creation_time_str = time_element.get_attribute('title')
-            if creation_time_str and '/' in creation_time_str:
-                try:
-                    creation_date = datetime.strptime(creation_time_str, "%d/%m/%Y, %H:%M:%S")
-                    token_info['creation_date'] = creation_date.strftime("%Y-%m-%d %H:%M:%S")
-                    token_info['creation_date_raw'] = creation_time_str
-                    token_info['age'] = time_element.text.strip()
-                    break
-                except:
-                    pass
-        
-        if 'creation_date' not in token_info:
-            token_info['creation_date'] = 'Unknown'
-            token_info['creation_date_raw'] = 'Unknown'
-            token_info['age'] = 'Unknown'
-        
-        # Extract token stats
-        stat_items = driver.find_elements(By.CLASS_NAME, '_statItem_z5b78_81')
-        for stat_item in stat_items:
-            label_element = stat_item.find_element(By.CLASS_NAME, '_statLabel_z5b78_90')
-            value_element = stat_item.find_element(By.CLASS_NAME, '_statValue_z5b78_97')
-            
-            label = label_element.text.strip().lower()
-            value = value_element.text.strip()
-            
-            if label == 'mc':
-                token_info['market_cap'] = value
-            elif label == 'supply':
-                token_info['supply'] = value
-            elif label == 'replies':
-                token_info['replies'] = value
-        
-        # Extract description
-        description_element = safe_find_element(driver, By.CLASS_NAME, '_tokenDescription_z5b78_105')
-        token_info['description'] = description_element.text.strip() if description_element else 'Unknown'
-        
-        return token_info
-        
+                fields = _read_fields_script(driver, SELECTORS)
+        return build_token_info(fields or {}, url)
+
     except Exception as e:
-        token_info['error'] = str(e)[:200]
-        return token_info
+        return {'url': url, 'error': str(e)[:200]}
 
 def main():
+    """Scrape meme_urls.json and write the reports from the result.
+
+    `python report.py` writes the same files from fomo.db without scraping.
+    """
     # Load meme URLs
     with open("meme_urls.json", "r") as file:
         meme_urls = json.load(file)
@@ -169,11 +353,7 @@ def main():
     
     # Save detailed token data
     with open("fomo_tokens_comprehensive.csv", "w", newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['name', 'ticker', 'creator_name', 'creator_address', 'creator_link', 
-                      'creator_title', 'creator_avatar_url', 'logo_url', 'market_cap', 
-                      'supply', 'replies', 'creation_date', 'creation_date_raw', 'age', 
-                      'description', 'url', 'error']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer = csv.DictWriter(csvfile, fieldnames=TOKEN_CSV_FIELDS)
         
         writer.writeheader()
         for token in tokens_data:
@@ -202,24 +382,8 @@ def main():
                 creator['creator_avatar_url'] = token.get('creator_avatar_url', '')
             
             # Calculate totals
-            if 'market_cap' in token and token['market_cap'] != 'Unknown':
-                try:
-                    cap_str = token['market_cap'].replace('$', '').replace(',', '')
-                    if 'K' in cap_str:
-                        cap_value = float(cap_str.replace('K', '')) * 1000
-                    elif 'M' in cap_str:
-                        cap_value = float(cap_str.replace('M', '')) * 1000000
-                    else:
-                        cap_value = float(cap_str)
-                    creator['total_market_cap'] += cap_value
-                except:
-                    pass
-            
-            if 'replies' in token and token['replies'] != 'Unknown':
-                try:
-                    creator['total_replies'] += int(token['replies'])
-                except:
-                    pass
+            creator['total_market_cap'] += parse_amount(token.get('market_cap')) or 0
+            creator['total_replies'] += parse_count(token.get('replies')) or 0
     
     # Write comprehensive creator summary
     with open("creator_summary_comprehensive.csv", "w", newline='', encoding='utf-8') as csvfile:
@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from fomobiz_to_html import SELECTORS, build_token_info
+from metrics import PAGE_LOAD_SECONDS, PAGES_SCRAPED, SCRAPE_FAILURES
+
+HTTP_WORKERS = int(os.getenv("SCRAPER_HTTP_WORKERS", "8"))
+HTTP_FETCH_ENABLED = os.getenv("SCRAPER_HTTP_FETCH", "1") == "1"
+HTTP_TIMEOUT = 10
+# Consecutive pages plain HTTP could not extract before it is switched off,
+# and how long it stays off before a batch probes it again
+HTTP_MAX_MISSES = int(os.getenv("SCRAPER_HTTP_MAX_MISSES", "20"))
+HTTP_COOLDOWN_SECONDS = float(os.getenv("SCRAPER_HTTP_COOLDOWN_SECONDS", "3600"))
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Shared keep-alive session sized for the HTTP worker count"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["User-Agent"] = USER_AGENT
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_WORKERS, max_retries=1)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+class FastPathGate:
+    """Switches the HTTP fast path off while it keeps missing.
+
+    fomo.biz renders token pages client-side, so plain HTTP may only ever
+    get an empty shell, and trying it first would just add a request per
+    page before the browser fallback. After `max_misses` pages in a row
+    yield nothing the fast path is skipped for `cooldown` seconds.
+    """
+
+    def __init__(self, max_misses=HTTP_MAX_MISSES, cooldown=HTTP_COOLDOWN_SECONDS):
+        self.max_misses = max_misses
+        self.cooldown = cooldown
+        self.misses = 0
+        self.disabled_until = 0.0
+        self._lock = threading.Lock()
+
+    def enabled(self):
+        return time.monotonic() >= self.disabled_until
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.misses = 0
+                return
+            self.misses += 1
+            if self.misses >= self.max_misses and self.enabled():
+                self.disabled_until = time.monotonic() + self.cooldown
+                self.misses = 0
+                logging.warning(
+                    f"HTTP fetch missed {self.max_misses} pages in a row; using the browser only for {self.cooldown:.0f}s"
+                )
+
+fast_path = FastPathGate()
+
+def _text(soup, selector):
+    element = soup.select_one(selector)
+    return element.get_text(strip=True) if element else None
+
+def _attr(soup, selector, attribute):
+    element = soup.select_one(selector)
+    return element.get(attribute) if element else None
+
+def parse_token_html(html, url):
+    """Parse a server-rendered token page into the same dict extract_token_data returns.
+
+    Returns None when the page lacks the token name or creator, which is
+    what a client-rendered shell looks like; callers then fall back to Selenium.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    creator = soup.select_one(SELECTORS['creator'])
+    logo_url = _attr(soup, SELECTORS['logo'], 'src')
+    avatar_url = _attr(soup, SELECTORS['avatar'], 'src')
+    fields = {
+        'full_name': _text(soup, SELECTORS['name']),
+        'ticker': _text(soup, SELECTORS['ticker']),
+        'logo_url': urljoin(url, logo_url) if logo_url else None,
+        'creator_href': urljoin(url, creator['href']) if creator is not None and creator.get('href') else None,
+        'creator_text': creator.get_text(strip=True) if creator is not None else None,
+        'creator_title': creator.get('title') if creator is not None else None,
+        'avatar_url': urljoin(url, avatar_url) if avatar_url else None,
+        'times': [[element.get('title'), element.get_text(strip=True)] for element in soup.select(SELECTORS['meta_time'])],
+        'stats': [
+            [_text(item, SELECTORS['stat_label']), _text(item, SELECTORS['stat_value'])]
+            for item in soup.select(SELECTORS['stat_item'])
+        ],
+        'description': _text(soup, SELECTORS['description']),
+    }
+    if not fields['full_name'] or not fields['creator_href']:
+        return None
+    return build_token_info(fields, url)
+
+def fetch_token_data(url, session=None):
+    """Fetch and parse a token page without a browser; None if that is not enough"""
+    if not fast_path.enabled():
+        return None
+    session = session or get_session()
+    try:
+        with PAGE_LOAD_SECONDS.time(fetcher="http"):
+            response = session.get(url, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logging.warning(f"HTTP fetch failed for {url}: {e}")
+        SCRAPE_FAILURES.inc(cause="http")
+        fast_path.record(False)
+        return None
+    token_info = parse_token_html(response.text, url)
+    PAGES_SCRAPED.inc(fetcher="http", result="complete" if token_info is not None else "incomplete")
+    fast_path.record(token_info is not None)
+    return token_info
+
+def fetch_all(urls, workers=HTTP_WORKERS):
+    """Fetch token pages concurrently over the pooled session, yielding (url, data) in input order"""
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from zip(urls, executor.map(lambda url: fetch_token_data(url, session), urls))
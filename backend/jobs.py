@@ -0,0 +1,195 @@
+import logging
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select, update
+from models import SessionLocal, ScrapeJob, WorkerLock
+from dbutil import upsert_insert
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = 30
+JOB_RETRY_MAX_SECONDS = 3600
+
+SCRAPE = "scrape"
+REFRESH = "refresh"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+def _claimable(now):
+    # Pending jobs whose backoff has passed, and running jobs whose worker
+    # stopped renewing its lease (crashed, killed, or wedged in Chrome)
+    return or_(
+        and_(ScrapeJob.status == PENDING, or_(ScrapeJob.next_attempt_at.is_(None), ScrapeJob.next_attempt_at <= now)),
+        and_(ScrapeJob.status == RUNNING, ScrapeJob.lease_expires_at < now),
+    )
+
+def enqueue(db, kind, urls, now=None):
+    """Add jobs for urls, skipping ones already queued.
+
+    A refresh job that already finished or died is reset to pending, so
+    refreshes of the same token reuse a single row.
+    """
+    if not urls:
+        return
+    now = now or datetime.now()
+    statement = upsert_insert(db, ScrapeJob)
+    if kind == REFRESH:
+        statement = statement.on_conflict_do_update(
+            index_elements=[ScrapeJob.kind, ScrapeJob.url],
+            set_={'status': PENDING, 'attempts': 0, 'next_attempt_at': now, 'last_error': None, 'updated_at': now},
+            where=or_(ScrapeJob.status == DONE, ScrapeJob.status == DEAD),
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[ScrapeJob.kind, ScrapeJob.url])
+    db.execute(statement, [
+        {'kind': kind, 'url': url, 'status': PENDING, 'attempts': 0, 'next_attempt_at': now, 'created_at': now, 'updated_at': now}
+        for url in urls
+    ])
+    db.commit()
+
+def claim(db, owner, limit, now=None):
+    """Lease up to `limit` jobs to `owner`, new pages before refreshes, and return them.
+
+    The claimable condition is checked again on the outer UPDATE, so when two
+    workers race for the same rows only one of them gets each job.
+    """
+    now = now or datetime.now()
+    candidates = select(ScrapeJob.id).filter(_claimable(now)).order_by(
+        (ScrapeJob.kind == SCRAPE).desc(), ScrapeJob.next_attempt_at
+    ).limit(limit)
+    db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id.in_(candidates.scalar_subquery()), _claimable(now))
+        .values(
+            status=RUNNING,
+            attempts=ScrapeJob.attempts + 1,
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+            updated_at=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return db.query(ScrapeJob.id, ScrapeJob.kind, ScrapeJob.url, ScrapeJob.attempts).filter(
+        ScrapeJob.lease_owner == owner, ScrapeJob.status == RUNNING
+    ).all()
+
+def extend_leases(db, owner, now=None):
+    now = now or datetime.now()
+    result = db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.lease_owner == owner, ScrapeJob.status == RUNNING)
+        .values(lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS), updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+def complete(db, job_ids, now=None):
+    """Mark jobs done. Does not commit: the caller commits it with the rows the jobs produced."""
+    if not job_ids:
+        return
+    now = now or datetime.now()
+    db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id.in_(job_ids))
+        .values(status=DONE, lease_owner=None, lease_expires_at=None, last_error=None, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at JOB_RETRY_MAX_SECONDS"""
+    delay = min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+def fail(db, jobs, error, now=None):
+    """Send failed jobs back to pending with a backoff, or to dead after JOB_MAX_ATTEMPTS"""
+    if not jobs:
+        return
+    now = now or datetime.now()
+    for job in jobs:
+        dead = job.attempts >= JOB_MAX_ATTEMPTS
+        db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id == job.id)
+            .values(
+                status=DEAD if dead else PENDING,
+                next_attempt_at=None if dead else now + retry_delay(job.attempts),
+                lease_owner=None,
+                lease_expires_at=None,
+                last_error=error,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if dead:
+            logging.warning(f"Giving up on {job.kind} job for {job.url} after {job.attempts} attempts: {error}")
+    db.commit()
+
+def queue_depth_query():
+    """Job counts per (kind, status), leaving out the ever-growing done rows"""
+    return select(ScrapeJob.kind, ScrapeJob.status, func.count(ScrapeJob.id)).filter(
+        ScrapeJob.status != DONE
+    ).group_by(ScrapeJob.kind, ScrapeJob.status)
+
+class Heartbeat:
+    """Renews an owner's leases from a background thread while a batch is worked on"""
+
+    def __init__(self, owner, interval=JOB_HEARTBEAT_SECONDS):
+        self.owner = owner
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                extend_leases(db, self.owner)
+            except Exception as e:
+                logging.error(f"Failed to extend leases for {self.owner}: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+def try_lock(db, name, owner, ttl, min_interval=timedelta(0), now=None):
+    """Take the named lock unless someone else holds it or it was released less than `min_interval` ago"""
+    now = now or datetime.now()
+    db.execute(upsert_insert(db, WorkerLock).on_conflict_do_nothing(index_elements=[WorkerLock.name]), [{'name': name}])
+    result = db.execute(
+        update(WorkerLock)
+        .where(
+            WorkerLock.name == name,
+            or_(WorkerLock.owner.is_(None), WorkerLock.expires_at < now),
+            or_(WorkerLock.last_finished_at.is_(None), WorkerLock.last_finished_at <= now - min_interval),
+        )
+        .values(owner=owner, expires_at=now + ttl)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def release_lock(db, name, owner, now=None):
+    now = now or datetime.now()
+    db.execute(
+        update(WorkerLock)
+        .where(WorkerLock.name == name, WorkerLock.owner == owner)
+        .values(owner=None, expires_at=None, last_finished_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
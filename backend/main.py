@@ -1,14 +1,74 @@
 from fastapi.middleware.cors import CORSMiddleware
 
 # Existing imports here
-from fastapi import FastAPI
-from models import SessionLocal, Token
-from fastapi.responses import JSONResponse
-from sqlalchemy import func, asc, desc
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from models import SessionLocal, AsyncSessionLocal, Token, TokenSnapshot, CreatorStats, DailyStats, MediaSource, TOKEN_CSV_COLUMNS
+from rollups import ensure_rollups
+from risk import ensure_risk_scores, UNKNOWN_CREATOR
+from search import search_terms, token_search_query, creator_search_query
+from media import MediaCache, HASH_PATTERN, MEDIA_MAX_AGE_SECONDS, MEDIA_PATH, MEDIA_PUBLIC_URL, ensure_media_sources, media_url
+from cache import ResponseCacheMiddleware
+from events import broker, events_after, follow_events, latest_event_id
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Match
+from fomobiz_to_html import TOKEN_CSV_FIELDS
+from normalize import format_datetime, parse_datetime
+from metrics import CONTENT_TYPE, JOB_QUEUE_DEPTH, REGISTRY, REQUEST_SECONDS
+from jobs import queue_depth_query
+from sqlalchemy import select, func, asc, desc, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import base64
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import zlib
 
 app = FastAPI()
 
+# Registered before CORS so CORS stays the outermost layer and also
+# decorates cached and 304 responses.
+app.add_middleware(
+    ResponseCacheMiddleware,
+    excluded_paths={"/api/v1/tokens/export", "/api/v1/events"},
+    excluded_prefixes=(MEDIA_PATH,),
+)
+
+def _route_template(scope):
+    """Path template of the route a request is for, found without routing it.
+
+    Cache hits and 304s never reach the router, so the route cannot be read
+    back from the scope afterwards.
+    """
+    partial = None
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Wraps the response cache, so cache hits are timed too. Streaming
+    # responses are timed until their headers are sent.
+    started = time.perf_counter()
+    response = await call_next(request)
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=_route_template(request.scope),
+        status=response.status_code,
+    )
+    return response
+
 # Explicitly add CORS middleware immediately after app creation:
 app.add_middleware(
     CORSMiddleware,
@@ -16,22 +76,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # explicitly allowing all HTTP methods
     allow_headers=["*"],  # explicitly allowing all headers
+    expose_headers=["X-Next-Cursor"],  # pagination cursor for /api/v1/tokens
 )
 
+async def get_db():
+    """One async session per request, closed even when the handler raises"""
+    async with AsyncSessionLocal() as session:
+        yield session
+
+@app.get("/metrics")
+async def get_metrics(db: AsyncSession = Depends(get_db)):
+    """Prometheus metrics of this API process, plus the shared job queue depth"""
+    rows = (await db.execute(queue_depth_query())).all()
+    JOB_QUEUE_DEPTH.replace({(kind, status): count for kind, status, count in rows})
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+# With COLUMNAR_STATS=1 (needs numpy) the stats endpoints and the creator
+# aggregates are answered from the token table held in memory as NumPy
+# columns; until they are loaded, and without the flag, the SQL paths below answer.
+COLUMNAR_STATS = os.getenv("COLUMNAR_STATS", "0") == "1"
+token_columns = None
+COLUMNAR_CREATOR_SORTS = ()
+if COLUMNAR_STATS:
+    from columnar import token_columns, CREATOR_SORT_KEYS as COLUMNAR_CREATOR_SORTS
+
+def _columns_ready():
+    return token_columns is not None and token_columns.ready
+
 @app.get("/api/v1/stats")
-def get_stats():
-    db = SessionLocal()
-    total_creators = db.query(func.count(func.distinct(Token.creator_address))).scalar()
-    total_tokens = db.query(func.count(Token.id)).scalar()
-    total_market_cap = db.query(func.sum(Token.market_cap)).scalar()
+async def get_stats(db: AsyncSession = Depends(get_db)):
+    if _columns_ready():
+        return token_columns.stats(datetime.now())
+
+    total_creators = await db.scalar(select(func.count(func.distinct(Token.creator_address))))
+    total_tokens = await db.scalar(select(func.count(Token.id)))
+    total_market_cap = await db.scalar(select(func.sum(Token.market_cap)))
 
     # explicitly count new tokens from last 24 hours
     twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
-    new_today = db.query(func.count(Token.id)).filter(
-        Token.creation_date >= twenty_four_hours_ago.strftime("%Y-%m-%d %H:%M:%S")
-    ).scalar()
-
-    db.close()
+    new_today = await db.scalar(select(func.count(Token.id)).filter(Token.creation_date >= twenty_four_hours_ago))
 
     return {
         "total_creators": total_creators,
@@ -40,123 +123,544 @@ def get_stats():
         "new_today": new_today
     }
 
+CREATOR_SORT_COLUMNS = {
+    "token_count": CreatorStats.token_count,
+    "total_market_cap": CreatorStats.total_market_cap,
+    "latest_token_date": CreatorStats.latest_token_date,
+    "first_token_date": CreatorStats.first_token_date,
+    "risk_score": CreatorStats.risk_score,
+}
+
+# Image URLs in responses point at the caching proxy instead of the origin.
+# They are root-relative unless MEDIA_PUBLIC_URL is set, never built from
+# the request's Host, because responses are cached across hosts.
+MEDIA_FIELDS = ("logo_url", "creator_avatar_url")
+MEDIA_BASE_URL = (MEDIA_PUBLIC_URL or "").rstrip("/")
+
+def _with_media_urls(record, base_url):
+    for field in MEDIA_FIELDS:
+        if field in record:
+            record[field] = media_url(record[field], base_url)
+    return record
+
+def _creator_json(creator, base_url):
+    return {
+        "creator_address": creator.creator_address,
+        "creator_name": creator.creator_name,
+        "creator_avatar_url": media_url(creator.creator_avatar_url, base_url),
+        "token_count": creator.token_count,
+        "total_market_cap": creator.total_market_cap,
+        "total_replies": creator.total_replies,
+        "first_token_date": format_datetime(creator.first_token_date),
+        "latest_token_date": format_datetime(creator.latest_token_date),
+        "risk_score": creator.risk_score,
+        "launches_24h": creator.launches_24h,
+        "launches_7d": creator.launches_7d,
+        "median_launch_gap": creator.median_launch_gap,
+        "market_cap_decay": creator.market_cap_decay,
+    }
+
 @app.get("/api/v1/creators")
-def get_creators(sort_by: str = "token_count", order: str = "desc"):
-    db = SessionLocal()
-
-    creators_query = db.query(
-        Token.creator_address,
-        func.count(Token.creator_address).label('token_count'),
-        func.sum(Token.market_cap).label('total_market_cap'),
-        func.max(Token.creation_date).label('latest_token_date'),
-        func.min(Token.creation_date).label('first_token_date')
-    ).group_by(Token.creator_address)
-
-    if sort_by == "token_count":
-        creators_query = creators_query.order_by(desc('token_count') if order == 'desc' else asc('token_count'))
-    elif sort_by == "total_market_cap":
-        creators_query = creators_query.order_by(desc('total_market_cap') if order == 'desc' else asc('total_market_cap'))
-    elif sort_by == "latest_token_date":
-        creators_query = creators_query.order_by(desc('latest_token_date') if order == 'desc' else asc('latest_token_date'))
-    elif sort_by == "first_token_date":
-        creators_query = creators_query.order_by(desc('first_token_date') if order == 'desc' else asc('first_token_date'))
-
-    creators = creators_query.all()
-
-    creators_list = []
-    for creator in creators:
-        tokens = db.query(Token).filter(Token.creator_address == creator.creator_address).all()
-        total_replies = sum(token.comments for token in tokens)
-        creators_list.append({
-            "creator_address": creator.creator_address,
-            "token_count": creator.token_count,
-            "total_market_cap": creator.total_market_cap,
-            "total_replies": total_replies,
-            "first_token_date": creator.first_token_date,
-            "latest_token_date": creator.latest_token_date
-        })
-
-    db.close()
-    return creators_list
-
-# Explicitly defined /tokens endpoint as you asked for
+async def get_creators(
+    sort_by: str = "token_count",
+    order: str = "desc",
+    creators: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # `creators` (comma-separated addresses) refetches a few rows by primary key
+    addresses = [address for address in (creators or "").split(",") if address]
+    if not addresses and _columns_ready() and sort_by in COLUMNAR_CREATOR_SORTS:
+        # Aggregates and order come from the columns; creator_stats only
+        # supplies names, avatars and risk scores, read without sorting
+        profiles = {row.creator_address: row for row in (await db.execute(select(*CreatorStats.__table__.columns))).all()}
+        return [
+            dict(
+                _creator_json(profiles[address], MEDIA_BASE_URL),
+                token_count=token_count, total_market_cap=total_market_cap, total_replies=total_replies,
+                first_token_date=format_datetime(first), latest_token_date=format_datetime(latest),
+            )
+            for address, token_count, total_market_cap, total_replies, first, latest
+            in token_columns.creator_rows(sort_by, order == "desc") if address in profiles
+        ]
+
+    # creator_stats is maintained by the scraper, so this is one indexed read
+    creators_query = select(CreatorStats)
+    if addresses:
+        creators_query = creators_query.filter(CreatorStats.creator_address.in_(addresses))
+    sort_column = CREATOR_SORT_COLUMNS.get(sort_by)
+    if sort_column is not None:
+        creators_query = creators_query.order_by(desc(sort_column) if order == 'desc' else asc(sort_column))
+
+    return [_creator_json(creator, MEDIA_BASE_URL) for creator in (await db.scalars(creators_query)).all()]
+
+DEFAULT_LEADERBOARD_SIZE = 20
+MAX_LEADERBOARD_SIZE = 500
+
+@app.get("/api/v1/creators/top")
+async def get_top_creators(
+    limit: int = Query(DEFAULT_LEADERBOARD_SIZE, ge=1, le=MAX_LEADERBOARD_SIZE),
+    min_tokens: int = Query(1, ge=1),
+    db: AsyncSession = Depends(get_db),
+):
+    """Serial-launcher leaderboard: the `limit` highest risk scores.
+
+    Creators scoring 0, which includes everyone with a single launch, are
+    not ranked, nor is the placeholder for tokens without a creator.
+    """
+    # Walks ix_creator_stats_risk_rank from the top and stops after `limit`
+    # matches; min_tokens and the address are checked on the index entries
+    query = select(CreatorStats).filter(CreatorStats.risk_score > 0, CreatorStats.creator_address != UNKNOWN_CREATOR)
+    if min_tokens > 1:
+        query = query.filter(CreatorStats.token_count >= min_tokens)
+    query = query.order_by(desc(CreatorStats.risk_score), asc(CreatorStats.creator_address)).limit(limit)
+    return [
+        dict(_creator_json(creator, MEDIA_BASE_URL), rank=rank)
+        for rank, creator in enumerate((await db.scalars(query)).all(), 1)
+    ]
+
+TOKEN_FIELDS = {
+    "id": Token.id,
+    "name": Token.name,
+    "ticker": Token.ticker,
+    "url": Token.url,
+    "logo_url": Token.logo_url,
+    "creator_address": Token.creator_address,
+    "creator_name": Token.creator_name,
+    "creator_avatar_url": Token.creator_avatar_url,
+    "creation_date": Token.creation_date,
+    "market_cap": Token.market_cap,
+    "supply": Token.supply,
+    "comments": Token.comments,
+    "description": Token.description,
+}
+TOKEN_SORT_KEYS = ("id", "creation_date")
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _json_value(value):
+    return format_datetime(value) if isinstance(value, datetime) else value
+
+def _encode_cursor(sort_value, token_id):
+    payload = json.dumps([_json_value(sort_value), token_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+def _decode_cursor(cursor, sort_by):
+    try:
+        sort_value, token_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if sort_by == "creation_date" and sort_value is not None:
+            sort_value = parse_datetime(sort_value)
+            if sort_value is None:
+                raise ValueError(cursor)
+        return sort_value, int(token_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_date_param(name, value):
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise HTTPException(status_code=400, detail=f"{name} must be a date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)")
+    return parsed
+
+def _parse_fields(fields):
+    if not fields:
+        return list(TOKEN_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in TOKEN_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def filter_tokens(query, creator=None, date_from=None, date_to=None, min_market_cap=None, ticker_prefix=None):
+    if creator:
+        query = query.filter(Token.creator_address == creator)
+    if date_from:
+        query = query.filter(Token.creation_date >= date_from)
+    if date_to:
+        query = query.filter(Token.creation_date <= date_to)
+    if min_market_cap is not None:
+        query = query.filter(Token.market_cap >= min_market_cap)
+    if ticker_prefix:
+        query = query.filter(Token.ticker.like(_escape_like(ticker_prefix) + "%", escape="\\"))
+    return query
+
 @app.get("/api/v1/tokens")
-def tokens_api_v1():
-    db = SessionLocal()
-    tokens = db.query(Token).all()
-
-    tokens_list = [{
-        "name": token.name,
-        "ticker": token.ticker,
-        "url": token.url,
-        "logo_url": token.logo_url,
-        "creator_address": token.creator_address,
-        "creator_name": token.creator_name,
-        "creator_avatar_url": token.creator_avatar_url,
-        "creation_date": token.creation_date,
-        "market_cap": token.market_cap,
-        "comments": token.comments
-    } for token in tokens]
-
-    db.close()
-    return JSONResponse(tokens_list)
+async def tokens_api_v1(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort_by: str = "id",
+    order: str = "asc",
+    fields: Optional[str] = None,
+    creator: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    min_market_cap: Optional[float] = None,
+    ticker_prefix: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    if sort_by not in TOKEN_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {', '.join(TOKEN_SORT_KEYS)}")
+    output_fields = _parse_fields(fields)
+    date_from, date_to = _parse_date_param("from", date_from), _parse_date_param("to", date_to)
+    sort_column = TOKEN_FIELDS[sort_by]
+    descending = order == "desc"
+
+    # The sort key and id are always selected so the next cursor can be built
+    columns = [TOKEN_FIELDS[field] for field in output_fields]
+    columns += [Token.id.label("_cursor_id"), sort_column.label("_cursor_sort")]
+
+    query = filter_tokens(select(*columns), creator, date_from, date_to, min_market_cap, ticker_prefix)
+
+    # Keyset pagination: seek past the last (sort value, id) instead of OFFSET.
+    # Tokens without a creation date sort first ascending and last descending.
+    if cursor:
+        sort_value, last_id = _decode_cursor(cursor, sort_by)
+        if sort_by == "id":
+            query = query.filter(Token.id < last_id if descending else Token.id > last_id)
+        elif sort_value is None:
+            if descending:
+                query = query.filter(sort_column.is_(None), Token.id < last_id)
+            else:
+                query = query.filter(or_(sort_column.isnot(None), Token.id > last_id))
+        elif descending:
+            query = query.filter(or_(
+                sort_column < sort_value, and_(sort_column == sort_value, Token.id < last_id), sort_column.is_(None)
+            ))
+        else:
+            query = query.filter(or_(sort_column > sort_value, and_(sort_column == sort_value, Token.id > last_id)))
+
+    if sort_by == "id":
+        query = query.order_by(desc(Token.id) if descending else asc(Token.id))
+    else:
+        query = query.order_by(
+            desc(sort_column).nulls_last() if descending else asc(sort_column).nulls_first(),
+            desc(Token.id) if descending else asc(Token.id)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    tokens_list = [
+        _with_media_urls({field: _json_value(row._mapping[field]) for field in output_fields}, MEDIA_BASE_URL)
+        for row in rows
+    ]
+
+    headers = {}
+    if has_more:
+        last = rows[-1]
+        headers["X-Next-Cursor"] = _encode_cursor(last._cursor_sort, last._cursor_id)
+    return JSONResponse(tokens_list, headers=headers)
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_BATCH_SIZE = 1000
+
+async def _export_chunks(format, creator, date_from, date_to, min_market_cap, ticker_prefix):
+    # The stream outlives the request handler, so it owns its session
+    async with AsyncSessionLocal() as db:
+        query = select(*[column.label(key) for key, column in TOKEN_CSV_COLUMNS.items()])
+        query = filter_tokens(query, creator, date_from, date_to, min_market_cap, ticker_prefix)
+        # yield_per streams rows off the cursor instead of materializing the table
+        rows = await db.stream(query.order_by(Token.id).execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        buffer = io.StringIO()
+        if format == "csv":
+            writer = csv.DictWriter(buffer, fieldnames=TOKEN_CSV_FIELDS, restval="")
+            writer.writeheader()
+        pending = 0
+        async for row in rows:
+            record = {key: _json_value(value) for key, value in row._mapping.items()}
+            if format == "csv":
+                writer.writerow(record)
+            else:
+                buffer.write(json.dumps(record) + "\n")
+            pending += 1
+            if pending >= EXPORT_BATCH_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if buffer.tell():
+            yield buffer.getvalue()
+
+async def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.get("/api/v1/tokens/export")
+async def export_tokens(
+    format: str = "ndjson",
+    gzip: bool = False,
+    creator: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    min_market_cap: Optional[float] = None,
+    ticker_prefix: Optional[str] = None,
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    date_from, date_to = _parse_date_param("from", date_from), _parse_date_param("to", date_to)
+
+    chunks = _export_chunks(format, creator, date_from, date_to, min_market_cap, ticker_prefix)
+    filename = f"fomo_tokens.{format}"
+    media_type = EXPORT_FORMATS[format]
+    if gzip:
+        chunks = _gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/v1/tokens/{token_id}/history")
+async def get_token_history(
+    token_id: int,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Market cap and reply points, finest resolution first for recent data"""
+    date_from, date_to = _parse_date_param("from", date_from), _parse_date_param("to", date_to)
+    if await db.scalar(select(Token.id).filter(Token.id == token_id)) is None:
+        raise HTTPException(status_code=404, detail="Token not found")
+
+    # Tiers never overlap in time, so one ordered scan yields the whole series
+    query = select(TokenSnapshot).filter(TokenSnapshot.token_id == token_id)
+    if date_from:
+        query = query.filter(TokenSnapshot.taken_at >= date_from)
+    if date_to:
+        query = query.filter(TokenSnapshot.taken_at <= date_to)
+    points = (await db.scalars(query.order_by(TokenSnapshot.taken_at))).all()
+
+    return [{
+        "timestamp": format_datetime(point.taken_at),
+        "resolution": point.resolution,
+        "market_cap": point.market_cap,
+        "comments": point.comments,
+    } for point in points]
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+@app.get("/api/v1/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: AsyncSession = Depends(get_db),
+):
+    """Ranked token and creator matches; every word of `q` matches as a prefix"""
+    terms = search_terms(q)
+    if not terms:
+        return {"tokens": [], "creators": []}
+
+    tokens = (await db.execute(token_search_query(terms, limit))).all()
+    creators = (await db.execute(creator_search_query(terms, limit))).all()
+    return {
+        "tokens": [
+            _with_media_urls({key: _json_value(value) for key, value in row._mapping.items()}, MEDIA_BASE_URL)
+            for row in tokens
+        ],
+        "creators": [dict(_creator_json(row.CreatorStats, MEDIA_BASE_URL), score=row.score) for row in creators],
+    }
+
+media_cache = MediaCache()
+# The image behind an origin URL can change, so clients revalidate as often
+# as the proxy itself does
+MEDIA_CACHE_CONTROL = f"public, max-age={MEDIA_MAX_AGE_SECONDS}"
+
+@app.get("/api/v1/media/{key}")
+async def get_media(key: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Thumbnail of a token logo or creator avatar, fetched from its origin and revalidated once stale"""
+    if not HASH_PATTERN.fullmatch(key):
+        raise HTTPException(status_code=404, detail="Unknown media")
+    cached = await asyncio.to_thread(media_cache.get, key)
+    if cached is None or media_cache.stale(key):
+        # Only URLs the scraper stored can be fetched, so the proxy cannot be aimed elsewhere
+        url = await db.scalar(select(MediaSource.url).filter(MediaSource.hash == key))
+        if url is None:
+            raise HTTPException(status_code=404, detail="Unknown media")
+        try:
+            cached = await media_cache.fetch(key, url)
+        except Exception as e:
+            logging.warning(f"Failed to fetch media {url}: {e}")
+            if cached is None:
+                raise HTTPException(status_code=502, detail="Image could not be fetched")
+    body, media_type = cached
+    etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+    headers = {"Cache-Control": MEDIA_CACHE_CONTROL, "ETag": etag}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+EVENT_KEEPALIVE_SECONDS = 15
+
+def _sse_message(event, event_id=None):
+    if event.get("type") == "new_token":
+        # Events are shared between subscribers, so rewrite a copy
+        event = dict(event, token=_with_media_urls(dict(event["token"]), MEDIA_BASE_URL))
+    data = f"data: {json.dumps(event, default=str)}\n\n"
+    return data if event_id is None else f"id: {event_id}\n{data}"
+
+@app.get("/api/v1/events")
+async def stream_events(request: Request):
+    """Server-Sent Events feed of new tokens and market cap changes.
+
+    Each event carries its outbox id, so a reconnecting client that sends
+    Last-Event-ID gets the events it missed, or a resync if they are gone.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    # Subscribed before the replay is read, so nothing falls in between
+    subscriber = broker.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            last_id = 0
+            if last_event_id.isdigit():
+                last_id = int(last_event_id)
+                missed = await events_after(last_id)
+                if missed is None:
+                    yield _sse_message({'type': 'resync'})
+                    last_id = 0
+                for event_id, event in missed or ():
+                    yield _sse_message(event, event_id)
+                    last_id = event_id
+            while not await request.is_disconnected():
+                try:
+                    event_id, event = await asyncio.wait_for(subscriber.queue.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event.get("type") == "resync":
+                    # The outbox ids started over; later events count from here
+                    yield _sse_message(event, event_id)
+                    last_id = event_id
+                    continue
+                if event_id <= last_id:
+                    # Already sent by the replay
+                    continue
+                yield _sse_message(event, event_id)
+                if subscriber.dropped and subscriber.queue.empty():
+                    # Events were lost while this client lagged; it should refetch
+                    yield _sse_message({'type': 'resync', 'dropped': subscriber.dropped})
+                    subscriber.dropped = 0
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+HISTORY_BUCKETS = ("day", "week", "month")
+
+def _bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+async def _daily_stats_days(db, date_from, date_to):
+    """Totals before the range and (day, new_tokens, market_cap, new_creators) rows from daily_stats"""
+    # Cumulative totals start from everything before the requested range
+    total_creators, total_tokens = 0, 0
+    if date_from:
+        total_creators, total_tokens = (await db.execute(select(
+            func.coalesce(func.sum(DailyStats.new_creators), 0),
+            func.coalesce(func.sum(DailyStats.new_tokens), 0)
+        ).filter(DailyStats.date < date_from.date()))).one()
+
+    days_query = select(DailyStats.date, DailyStats.new_tokens, DailyStats.market_cap, DailyStats.new_creators)
+    if date_from:
+        days_query = days_query.filter(DailyStats.date >= date_from.date())
+    if date_to:
+        days_query = days_query.filter(DailyStats.date <= date_to.date())
+    return total_creators, total_tokens, (await db.execute(days_query.order_by(DailyStats.date))).all()
+
+def _columnar_days(date_from, date_to):
+    """The same as _daily_stats_days, computed from the in-memory columns"""
+    days, new_tokens, market_cap, new_creators = token_columns.daily_history()
+    start = 0 if date_from is None else int(days.searchsorted(date_from.date()))
+    end = len(days) if date_to is None else int(days.searchsorted(date_to.date(), side="right"))
+    rows = zip(days[start:end].tolist(), new_tokens[start:end].tolist(),
+               market_cap[start:end].tolist(), new_creators[start:end].tolist())
+    return int(new_creators[:start].sum()), int(new_tokens[:start].sum()), rows
 
 @app.get("/api/v1/stats/history")
-def get_historical_stats():
-    db = SessionLocal()
-    tokens = db.query(Token).all()
-
-    historical = {}
-    for token in tokens:
-        date = token.creation_date.split(' ')[0]
-        if date not in historical:
-            historical[date] = {
-                "creators": set(),
-                "tokens": 0,
-                "market_cap": 0,
-                "new_tokens": 0
-            }
-        historical[date]["creators"].add(token.creator_address)
-        historical[date]["tokens"] += 1
-        historical[date]["market_cap"] += token.market_cap
-        historical[date]["new_tokens"] += 1
+async def get_historical_stats(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    bucket: str = "day",
+    db: AsyncSession = Depends(get_db),
+):
+    if bucket not in HISTORY_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(HISTORY_BUCKETS)}")
+    date_from, date_to = _parse_date_param("from", date_from), _parse_date_param("to", date_to)
+
+    if _columns_ready():
+        total_creators, total_tokens, days = _columnar_days(date_from, date_to)
+    else:
+        total_creators, total_tokens, days = await _daily_stats_days(db, date_from, date_to)
 
-    sorted_dates = sorted(historical.keys())
     data = []
-    cumulative_creators = set()
-    cumulative_tokens = 0
-    cumulative_market_cap = 0
-
-    for date in sorted_dates:
-        daily_data = historical[date]
-        cumulative_creators.update(daily_data["creators"])
-        cumulative_tokens += daily_data["tokens"]
-        cumulative_market_cap = daily_data["market_cap"]
-
-        data.append({
-            "date": date,
-            "total_creators": len(cumulative_creators),
-            "total_tokens": cumulative_tokens,
-            "market_cap": cumulative_market_cap,
-            "new_tokens": daily_data["new_tokens"]
-        })
-
-    db.close()
+    for day, new_tokens, market_cap, new_creators in days:
+        total_creators += new_creators
+        total_tokens += new_tokens
+        bucket_date = _bucket_start(day, bucket).isoformat()
+        if data and data[-1]["date"] == bucket_date:
+            entry = data[-1]
+            entry["market_cap"] += market_cap
+            entry["new_tokens"] += new_tokens
+            entry["new_creators"] += new_creators
+        else:
+            entry = {
+                "date": bucket_date,
+                "market_cap": market_cap,
+                "new_tokens": new_tokens,
+                "new_creators": new_creators
+            }
+            data.append(entry)
+        entry["total_creators"] = total_creators
+        entry["total_tokens"] = total_tokens
+
     return data
 
 
 import threading
-from scraper import scrape_and_update
-import time
+from worker import run_worker
+
+# The scraper runs as its own process (python worker.py). For a single
+# process setup it can still be started inside the API with EMBEDDED_SCRAPER=1.
+EMBEDDED_SCRAPER = os.getenv("EMBEDDED_SCRAPER", "0") == "1"
 
-def run_periodic_scraper():
-    while True:
-        print("🚀 Explicitly starting scraper.")
-        scrape_and_update()  # Waits explicitly until this completes entirely
-        print("✅ Scraper explicitly finished.")
-        print("⏳ Explicitly waiting 30 seconds before next scrape.")
-        time.sleep(30)  # Explicitly waits 30 seconds after scraping finishes
+_background_tasks = set()
 
 @app.on_event("startup")
 async def startup_event():
-    threading.Thread(target=run_periodic_scraper, daemon=True).start()
\ No newline at end of file
+    with SessionLocal() as db:
+        ensure_rollups(db)
+        ensure_risk_scores(db)
+        ensure_media_sources(db)
+    # The columns are loaded after the outbox position is read, so no
+    # change committed meanwhile is missed; they buffer events until loaded.
+    after_id = await latest_event_id()
+    listeners = [token_columns.apply_events] if token_columns is not None else []
+    _background_tasks.add(asyncio.create_task(follow_events(listeners=listeners, after_id=after_id)))
+    if token_columns is not None:
+        _background_tasks.add(asyncio.create_task(token_columns.load()))
+    if EMBEDDED_SCRAPER:
+        threading.Thread(target=run_worker, daemon=True).start()
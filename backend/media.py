@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import requests
+from PIL import Image
+from sqlalchemy import insert, or_
+from models import Token, MediaSource
+from dbutil import chunks
+
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "./media_cache")
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+MEDIA_THUMBNAIL_SIZE = int(os.getenv("MEDIA_THUMBNAIL_SIZE", "128"))
+MEDIA_FETCH_TIMEOUT = float(os.getenv("MEDIA_FETCH_TIMEOUT", "10"))
+# Age after which a thumbnail is revalidated against its origin
+MEDIA_MAX_AGE_SECONDS = int(os.getenv("MEDIA_MAX_AGE_SECONDS", str(24 * 3600)))
+MEDIA_MAX_SOURCE_BYTES = 10 * 1024 * 1024
+# Public base URL of the API for rewritten image URLs; without it they are root-relative
+MEDIA_PUBLIC_URL = os.getenv("MEDIA_PUBLIC_URL")
+MEDIA_PATH = "/api/v1/media/"
+
+HASH_PATTERN = re.compile(r"[0-9a-f]{32}")
+# Raster images are resized to WebP thumbnails; SVGs are already small and kept as is
+MEDIA_TYPES = {"webp": "image/webp", "svg": "image/svg+xml"}
+# Origin response headers kept next to a thumbnail to revalidate it with
+VALIDATOR_HEADERS = {"etag": "If-None-Match", "last-modified": "If-Modified-Since"}
+
+def media_hash(url):
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+def is_media_url(url):
+    return isinstance(url, str) and url.startswith(("http://", "https://"))
+
+def media_url(url, base_url):
+    """Proxy URL for an image URL; anything that is not an http(s) URL is returned unchanged"""
+    if not is_media_url(url):
+        return url
+    return f"{base_url}{MEDIA_PATH}{media_hash(url)}"
+
+def media_sources(rows):
+    """media_sources rows for the image URLs of token rows"""
+    urls = {row.get(key) for row in rows for key in ('logo_url', 'creator_avatar_url')}
+    return [{'hash': media_hash(url), 'url': url} for url in urls if is_media_url(url)]
+
+def ensure_media_sources(db):
+    """Register the image URLs of existing tokens once, for databases that predate the proxy"""
+    if db.query(MediaSource.hash).first() is not None or db.query(Token.id).first() is None:
+        return
+    urls = set()
+    for column in (Token.logo_url, Token.creator_avatar_url):
+        urls.update(url for url, in db.query(column).filter(or_(
+            column.like("http://%"), column.like("https://%")
+        )).distinct())
+    for batch in chunks(urls):
+        db.execute(insert(MediaSource), [{'hash': media_hash(url), 'url': url} for url in batch])
+    db.commit()
+    logging.info(f"Registered {len(urls)} image URLs for the media proxy")
+
+def download_thumbnail(url, size=MEDIA_THUMBNAIL_SIZE, validators=None):
+    """Fetch an image and return (body, extension, validators) of its thumbnail.
+
+    With the `validators` of an earlier download the request is
+    conditional, and None is returned when the origin reports no change.
+    """
+    headers = {VALIDATOR_HEADERS[name]: value for name, value in (validators or {}).items() if name in VALIDATOR_HEADERS}
+    with requests.get(url, headers=headers, timeout=MEDIA_FETCH_TIMEOUT, stream=True) as response:
+        if response.status_code == 304 and headers:
+            return None
+        response.raise_for_status()
+        body = response.raw.read(MEDIA_MAX_SOURCE_BYTES + 1, decode_content=True)
+        content_type = response.headers.get("content-type", "")
+        validators = {name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers}
+    if len(body) > MEDIA_MAX_SOURCE_BYTES:
+        raise ValueError(f"Image larger than {MEDIA_MAX_SOURCE_BYTES} bytes")
+    if content_type.startswith("image/svg") or body.lstrip()[:5] in (b"<?xml", b"<svg "):
+        return body, "svg", validators
+
+    image = Image.open(io.BytesIO(body))
+    image.thumbnail((size, size))
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    output = io.BytesIO()
+    image.save(output, "WEBP", quality=80)
+    return output.getvalue(), "webp", validators
+
+class MediaCache:
+    """Thumbnails on disk named by media hash, evicted least recently used past `max_bytes`.
+
+    Recency is kept in memory; after a restart it starts out in the order
+    the files were written. Processes sharing the directory each evict by
+    their own view; a file another process removed is simply fetched again.
+    A thumbnail older than `max_age` seconds is stale: it is revalidated
+    with the ETag or Last-Modified its origin sent, kept in a sidecar file.
+    """
+
+    def __init__(self, directory=MEDIA_CACHE_DIR, max_bytes=MEDIA_CACHE_MAX_BYTES, max_age=MEDIA_MAX_AGE_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._fetches = {}
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            key, _, extension = name.partition(".")
+            if HASH_PATTERN.fullmatch(key) and extension in MEDIA_TYPES:
+                stat = os.stat(os.path.join(directory, name))
+                files.append((stat.st_mtime, key, extension, stat.st_size))
+        for fetched_at, key, extension, size in sorted(files):
+            self._entries[key] = (extension, size, fetched_at)
+            self._total_bytes += size
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def _validators_path(self, key):
+        return os.path.join(self.directory, f"{key}.validators")
+
+    def get(self, key):
+        """(body, media type) of a cached thumbnail, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        extensions = [entry[0]] if entry else list(MEDIA_TYPES)
+        for extension in extensions:
+            try:
+                with open(self._path(key, extension), "rb") as f:
+                    body = f.read()
+                    fetched_at = os.fstat(f.fileno()).st_mtime
+            except FileNotFoundError:
+                continue
+            if entry is None:
+                # Written by another process sharing the directory
+                self._add(key, extension, len(body), fetched_at)
+            return body, MEDIA_TYPES[extension]
+        if entry is not None:
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._total_bytes -= entry[1]
+        return None
+
+    def stale(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is not None and time.time() - entry[2] >= self.max_age
+
+    def put(self, key, body, extension, validators=None):
+        path = self._path(key, extension)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(body)
+        os.replace(temporary, path)
+        if validators:
+            with open(self._validators_path(key), "w") as f:
+                json.dump(validators, f)
+        else:
+            self._remove(self._validators_path(key))
+        self._add(key, extension, len(body), time.time())
+
+    def _validators(self, key):
+        try:
+            with open(self._validators_path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _renew(self, key):
+        """Mark a stale thumbnail fresh again after the origin confirmed it"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return False
+        try:
+            os.utime(self._path(key, entry[0]))
+        except FileNotFoundError:
+            return False
+        self._add(key, entry[0], entry[1], time.time())
+        return True
+
+    def _add(self, key, extension, size, fetched_at):
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+                if previous[0] != extension:
+                    evicted.append(self._path(key, previous[0]))
+            self._entries[key] = (extension, size, fetched_at)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_extension, old_size, _) = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                evicted += [self._path(old_key, old_extension), self._validators_path(old_key)]
+        for path in evicted:
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes
+
+    async def fetch(self, key, url):
+        """Cached thumbnail for `url`, downloading it once however many requests wait on it"""
+        fetch = self._fetches.get(key)
+        if fetch is None:
+            fetch = self._fetches[key] = asyncio.ensure_future(self._download(key, url))
+            fetch.add_done_callback(lambda _: self._fetches.pop(key, None))
+        return await asyncio.shield(fetch)
+
+    async def _download(self, key, url):
+        validators = await asyncio.to_thread(self._validators, key)
+        result = await asyncio.to_thread(download_thumbnail, url, MEDIA_THUMBNAIL_SIZE, validators)
+        if result is None:
+            # Unchanged at the origin
+            if await asyncio.to_thread(self._renew, key):
+                cached = await asyncio.to_thread(self.get, key)
+                if cached is not None:
+                    return cached
+            result = await asyncio.to_thread(download_thumbnail, url)
+        body, extension, validators = result
+        await asyncio.to_thread(self.put, key, body, extension, validators)
+        return body, MEDIA_TYPES[extension]
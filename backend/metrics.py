@@ -0,0 +1,186 @@
+"""Process-local counters and histograms rendered in the Prometheus text format.
+
+The API serves its registry on /metrics; scraper workers serve theirs on
+WORKER_METRICS_PORT. Updating a metric is a dict lookup and an add under a
+lock, cheap enough for the per-page hot path.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def replace(self, values):
+        """Swap in a full set of {label tuple: value}, dropping label sets that disappeared"""
+        with self._lock:
+            self._values = dict(values)
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = {key: ([*entry[0]], entry[1], entry[2]) for key, entry in self._values.items()}
+        lines = []
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+# Scraper
+PAGE_LOAD_SECONDS = Histogram(
+    "fomo_scraper_page_load_seconds", "Time to load a token page", ["fetcher"])
+EXTRACT_SECONDS = Histogram(
+    "fomo_scraper_extract_seconds", "Time to read the token fields off a loaded page", ["mode"])
+PAGES_SCRAPED = Counter(
+    "fomo_scraper_pages_total", "Token pages scraped, by fetcher and whether the data was complete", ["fetcher", "result"])
+MISSING_FIELDS = Counter(
+    "fomo_scraper_missing_fields_total", "Token pages where a field could not be read", ["field"])
+SCRAPE_RETRIES = Counter(
+    "fomo_scraper_retries_total", "Browser scrape attempts that were retried")
+SCRAPE_FAILURES = Counter(
+    "fomo_scraper_failures_total", "Failed scrape attempts by cause", ["cause"])
+DRIVER_RESTARTS = Counter(
+    "fomo_scraper_driver_restarts_total", "Chrome drivers replaced, by reason", ["reason"])
+JOB_QUEUE_DEPTH = Gauge(
+    "fomo_job_queue_depth", "Scrape jobs by kind and status", ["kind", "status"])
+
+# Writer
+COMMIT_SECONDS = Histogram(
+    "fomo_writer_commit_seconds", "Time to write and commit one batch")
+ROWS_WRITTEN = Counter(
+    "fomo_writer_rows_total", "Token rows committed", ["operation"])
+FAILED_BATCHES = Counter(
+    "fomo_writer_failed_batches_total", "Batches rolled back")
+
+# API
+REQUEST_SECONDS = Histogram(
+    "fomo_http_request_duration_seconds", "API request latency by route", ["method", "route", "status"])
+
+def start_http_server(port, before_render=None, registry=REGISTRY):
+    """Serve the registry on http://0.0.0.0:port/metrics from a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            if before_render is not None:
+                try:
+                    before_render()
+                except Exception as e:
+                    logging.error(f"Failed to collect metrics: {e}")
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"Serving metrics on port {port}")
+    return server
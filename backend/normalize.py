@@ -0,0 +1,52 @@
+import re
+from datetime import date, datetime
+
+# Suffixes fomo.biz uses for abbreviated amounts, e.g. "$12.5K" or "1.2B"
+AMOUNT_SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+AMOUNT_PATTERN = re.compile(r'^([-+]?\d*\.?\d+)\s*([KMBT]?)$', re.IGNORECASE)
+
+# Formats dates arrive in: our own storage format and the token page's title
+DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y, %H:%M:%S",
+    "%Y-%m-%d",
+)
+# How dates are written to API responses, exports and events
+DATETIME_OUTPUT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def parse_amount(value):
+    """Parse a scraped amount like "$1,234.5", "$12.5K" or "3.1M" into a float; None if unparseable"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    cleaned = str(value).strip().replace('$', '').replace(',', '').replace(' ', '')
+    match = AMOUNT_PATTERN.match(cleaned)
+    if not match:
+        return None
+    number, suffix = match.groups()
+    return float(number) * AMOUNT_SUFFIXES.get(suffix.upper(), 1)
+
+def parse_count(value):
+    """Parse a scraped count such as replies ("17", "1.2K") into an int; None if unparseable"""
+    amount = parse_amount(value)
+    return int(round(amount)) if amount is not None else None
+
+def parse_datetime(value):
+    """Parse a stored or scraped date into a datetime; None for "Unknown" and other junk"""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    value = str(value).strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def format_datetime(value):
+    return value.strftime(DATETIME_OUTPUT_FORMAT) if value is not None else None
@@ -0,0 +1,64 @@
+import os
+from datetime import timedelta
+from sqlalchemy import or_
+from models import Token
+from normalize import parse_datetime
+
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "200"))
+
+HOT_INTERVAL = timedelta(minutes=1)
+WARM_INTERVAL = timedelta(minutes=15)
+COOL_INTERVAL = timedelta(hours=2)
+DEAD_INTERVAL = timedelta(days=1)
+
+HOT_MARKET_CAP = 50000
+WARM_MARKET_CAP = 5000
+# Relative market cap move on the last refresh that counts as volatile
+VOLATILE_CHANGE = 0.05
+
+def refresh_interval(market_cap, creation_date, change, now):
+    """Pick how long a token can go before its next refresh.
+
+    Fresh, high market cap and volatile tokens are refreshed every minute;
+    old tokens whose numbers stopped moving drop to once a day.
+    """
+    created = parse_datetime(creation_date)
+    age = now - created if created else None
+    market_cap = market_cap or 0
+
+    if (age is not None and age < timedelta(days=1)) or market_cap >= HOT_MARKET_CAP or change >= VOLATILE_CHANGE:
+        return HOT_INTERVAL
+    if (age is not None and age < timedelta(days=7)) or market_cap >= WARM_MARKET_CAP:
+        return WARM_INTERVAL
+    if change > 0:
+        return COOL_INTERVAL
+    return DEAD_INTERVAL
+
+def relative_change(old, new):
+    if not old:
+        return 1.0 if new else 0.0
+    return abs(new - old) / abs(old)
+
+def next_refresh_time(market_cap, creation_date, now, change=0.0):
+    return now + refresh_interval(market_cap, creation_date, change, now)
+
+def retry_refresh_time(market_cap, creation_date, last_refreshed_at, now):
+    """When to retry a token whose refresh failed.
+
+    The wait is its normal interval or, if longer, as long as it has gone
+    without a successful refresh, up to DEAD_INTERVAL; repeated failures
+    roughly double it each time.
+    """
+    interval = refresh_interval(market_cap, creation_date, 0.0, now)
+    if last_refreshed_at is not None:
+        interval = max(interval, min(now - last_refreshed_at, DEAD_INTERVAL))
+    return now + interval
+
+def due_tokens(db, now, limit=REFRESH_BATCH_SIZE):
+    """The most overdue tokens, at most `limit` of them, never-scheduled ones first"""
+    return db.query(
+        Token.id, Token.url, Token.ticker, Token.market_cap, Token.creation_date, Token.creator_address,
+        Token.last_refreshed_at,
+    ).filter(
+        or_(Token.next_refresh_at.is_(None), Token.next_refresh_at <= now)
+    ).order_by(Token.next_refresh_at.is_(None).desc(), Token.next_refresh_at).limit(limit).all()
@@ -0,0 +1,297 @@
+import argparse
+import csv
+import html
+import logging
+import os
+import time
+from operator import itemgetter
+from sqlalchemy import select, desc, asc, func
+from models import SessionLocal, Token, CreatorStats, SQLITE_PRAGMAS, TOKEN_CSV_COLUMNS
+from fomobiz_to_html import TOKEN_CSV_FIELDS
+from normalize import format_datetime
+from rollups import ensure_rollups
+
+REPORT_BATCH_SIZE = 5000
+PARQUET_BATCH_SIZE = 50000
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+CREATOR_CSV_HEADER = ['Creator Name', 'Creator Address', 'Number of Tokens', 'Token Names/Tickers',
+                      'Total Market Cap', 'Total Replies', 'First Token Date', 'Latest Token Date',
+                      'Creator Avatar URL', 'All Token Links']
+
+REPORT_KEYS = list(TOKEN_CSV_COLUMNS)
+NAME, TICKER, CREATOR_NAME, CREATOR_ADDRESS, CREATOR_AVATAR_URL = range(5)
+MARKET_CAP, REPLIES, CREATION_DATE, URL = (REPORT_KEYS.index(key) for key in ("market_cap", "replies", "creation_date", "url"))
+# Picks the token CSV columns out of a report row padded with one empty value
+token_csv_row = itemgetter(*[REPORT_KEYS.index(field) if field in TOKEN_CSV_COLUMNS else len(REPORT_KEYS)
+                             for field in TOKEN_CSV_FIELDS])
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Fomo.biz Creator Summary</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        table { border-collapse: collapse; width: 100%; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #4CAF50; color: white; }
+        tr:nth-child(even) { background-color: #f2f2f2; }
+        tr:hover { background-color: #ddd; }
+        .token-links { max-width: 300px; overflow-x: auto; white-space: nowrap; }
+        .token-link { margin-right: 10px; }
+        .avatar { width: 40px; height: 40px; border-radius: 20px; }
+    </style>
+</head>
+<body>
+    <h1>Fomo.biz Creator Summary</h1>
+    <table>
+        <tr>
+            <th>Avatar</th>
+            <th>Creator</th>
+            <th>Address</th>
+            <th>Tokens</th>
+            <th>All Tokens</th>
+            <th>Total MC</th>
+            <th>Replies</th>
+            <th>First Token</th>
+            <th>Latest Token</th>
+        </tr>
+"""
+HTML_FOOTER = """    </table>
+</body>
+</html>
+"""
+
+def format_market_cap(amount):
+    if amount > 1000000:
+        return f"${amount / 1000000:.2f}M"
+    if amount > 1000:
+        return f"${amount / 1000:.2f}K"
+    return f"${amount:.2f}" if amount > 0 else "Unknown"
+
+def report_query(dialect):
+    """Every token, grouped by creator, most prolific creators first.
+
+    Group order comes from creator_stats, so the grouping is one sort in
+    the database; tokens without a creator_stats row come last on every
+    database.
+    """
+    columns = [column.label(key) for key, column in TOKEN_CSV_COLUMNS.items()]
+    if dialect == "sqlite":
+        # Dates are stored as "YYYY-MM-DD HH:MM:SS.ffffff"; cutting the text
+        # is far cheaper than parsing and reformatting every datetime
+        columns[CREATION_DATE] = func.substr(Token.creation_date, 1, 19).label("creation_date")
+    return select(*columns).outerjoin(
+        CreatorStats, CreatorStats.creator_address == Token.creator_address
+    ).order_by(
+        desc(CreatorStats.token_count).nulls_last(), asc(Token.creator_address), asc(Token.id)
+    )
+
+class CreatorGroup:
+    """Running summary of one creator's tokens; only display fields are kept per token.
+
+    Dates are formatted strings, which order the same as the dates.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.creator_name = ''
+        self.creator_avatar_url = ''
+        self.count = 0
+        self.total_market_cap = 0.0
+        self.total_replies = 0
+        self.first_date = None
+        self.latest_date = None
+        self.tokens = []
+
+    def add(self, row):
+        self.count += 1
+        if not self.creator_name and row[CREATOR_NAME]:
+            self.creator_name = row[CREATOR_NAME]
+            self.creator_avatar_url = row[CREATOR_AVATAR_URL] or ''
+        self.total_market_cap += row[MARKET_CAP] or 0
+        self.total_replies += row[REPLIES] or 0
+        created = row[CREATION_DATE]
+        if created is not None:
+            if self.first_date is None or created < self.first_date:
+                self.first_date = created
+            if self.latest_date is None or created > self.latest_date:
+                self.latest_date = created
+        self.tokens.append((row[NAME] or 'Unknown', row[TICKER] or 'Unknown', row[URL] or '#'))
+
+class ParquetTokenWriter:
+    """Token rows to Parquet in bounded row groups (needs pyarrow)"""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self.schema = pa.schema([
+            (key, pa.float64() if key in ("market_cap", "supply") else
+                  pa.int64() if key == "replies" else
+                  pa.timestamp("s") if key == "creation_date" else pa.string())
+            for key in TOKEN_CSV_COLUMNS
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema)
+        self._rows = []
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= PARQUET_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            pa = self._pa
+            columns = [
+                # creation_date arrives as formatted text and is cast back to a timestamp
+                pa.array(values, pa.string()).cast(field.type) if field.name == "creation_date"
+                else pa.array(values, field.type)
+                for field, values in zip(self.schema, zip(*self._rows))
+            ]
+            self._writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+            self._rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+def generate_report(db, output_dir=".", parquet=False):
+    """Write the token CSV, creator summary CSV and HTML report in one pass over the tokens.
+
+    Memory is bounded by the largest creator's token list and the Parquet
+    row group; on SQLite the grouping sort spills to temporary files
+    instead of memory. Returns counts and the five most prolific creators.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "tokens": os.path.join(output_dir, "fomo_tokens_comprehensive.csv"),
+        "creators": os.path.join(output_dir, "creator_summary_comprehensive.csv"),
+        "html": os.path.join(output_dir, "creator_summary_with_links.html"),
+    }
+    if parquet:
+        paths["parquet"] = os.path.join(output_dir, "fomo_tokens.parquet")
+
+    tokens = creators = 0
+    top_creators = []
+    with open(paths["tokens"], "w", newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as tokens_file, \
+            open(paths["creators"], "w", newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as creators_file, \
+            open(paths["html"], "w", encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as html_file:
+        token_writer = csv.writer(tokens_file)
+        token_writer.writerow(TOKEN_CSV_FIELDS)
+        creator_writer = csv.writer(creators_file)
+        creator_writer.writerow(CREATOR_CSV_HEADER)
+        html_file.write(HTML_HEADER)
+        parquet_writer = ParquetTokenWriter(paths["parquet"]) if parquet else None
+
+        def finish(group):
+            nonlocal creators
+            if group is None:
+                return
+            creators += 1
+            if len(top_creators) < 5:
+                top_creators.append((group.creator_name, group.address, group.count))
+            write_creator(creator_writer, html_file, group)
+
+        connection = db.connection()
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            connection.exec_driver_sql("PRAGMA temp_store=FILE")
+        try:
+            rows = connection.execution_options(yield_per=REPORT_BATCH_SIZE).execute(report_query(dialect))
+            group = None
+            for row in rows:
+                row = tuple(row)
+                if dialect != "sqlite" and row[CREATION_DATE] is not None:
+                    row = row[:CREATION_DATE] + (format_datetime(row[CREATION_DATE]),) + row[CREATION_DATE + 1:]
+                tokens += 1
+                token_writer.writerow(token_csv_row(row + ("",)))
+                if parquet_writer is not None:
+                    parquet_writer.write(row)
+                address = row[CREATOR_ADDRESS]
+                if not address or address == 'Unknown':
+                    # Not a creator; these tokens only go to the token files
+                    continue
+                if group is None or address != group.address:
+                    finish(group)
+                    group = CreatorGroup(address)
+                group.add(row)
+            finish(group)
+        finally:
+            if dialect == "sqlite":
+                connection.exec_driver_sql(f"PRAGMA temp_store={SQLITE_PRAGMAS['temp_store']}")
+
+        html_file.write(HTML_FOOTER)
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    return {"tokens": tokens, "creators": creators, "top_creators": top_creators, "files": paths}
+
+def write_creator(creator_writer, html_file, group):
+    """One creator's row in the summary CSV and the HTML table"""
+    total_cap_str = format_market_cap(group.total_market_cap)
+    first_date = group.first_date or "Unknown"
+    latest_date = group.latest_date or "Unknown"
+    creator_writer.writerow([
+        group.creator_name,
+        group.address,
+        group.count,
+        "; ".join(f"{name} ({ticker})" for name, ticker, _ in group.tokens),
+        total_cap_str,
+        group.total_replies,
+        first_date,
+        latest_date,
+        group.creator_avatar_url,
+        "; ".join(f"{ticker} ({url})" for _, ticker, url in group.tokens),
+    ])
+
+    escape = html.escape
+    token_links = "".join(
+        f'<a href="{escape(url)}" target="_blank" class="token-link">{escape(ticker)}</a>'
+        for _, ticker, url in group.tokens
+    )
+    avatar_html = ''
+    if group.creator_avatar_url and group.creator_avatar_url != 'Unknown':
+        avatar_html = f'<img src="{escape(group.creator_avatar_url)}" class="avatar" alt="{escape(group.creator_name)}">'
+    html_file.write(
+        f"        <tr>\n"
+        f"            <td>{avatar_html}</td>\n"
+        f"            <td>{escape(group.creator_name)}</td>\n"
+        f"            <td>{escape(group.address)}</td>\n"
+        f"            <td>{group.count}</td>\n"
+        f"            <td class=\"token-links\">{token_links}</td>\n"
+        f"            <td>{total_cap_str}</td>\n"
+        f"            <td>{group.total_replies}</td>\n"
+        f"            <td>{first_date}</td>\n"
+        f"            <td>{latest_date}</td>\n"
+        f"        </tr>\n"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the token and creator reports from the database.")
+    parser.add_argument("--output-dir", default=".", help="directory for the report files")
+    parser.add_argument("--parquet", action="store_true", help="also write fomo_tokens.parquet (needs pyarrow)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # Creator order comes from creator_stats
+        ensure_rollups(db)
+        result = generate_report(db, args.output_dir, args.parquet)
+    finally:
+        db.close()
+
+    print(f"\n✅ Finished in {time.perf_counter() - started:.1f}s! Total tokens: {result['tokens']}")
+    print(f"Unique creators: {result['creators']}")
+    print("\nTop 5 most active creators:")
+    for name, address, count in result['top_creators']:
+        print(f"{name} ({address}): {count} tokens")
+    print("\nFiles created:")
+    for path in result['files'].values():
+        print(path)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
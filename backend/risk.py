@@ -0,0 +1,126 @@
+import logging
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from statistics import median
+from sqlalchemy import func, update
+from models import Token, TokenSnapshot, CreatorStats
+from dbutil import chunks
+from events import record_change
+
+# Stored as the creator of tokens whose page showed none; not a real creator
+UNKNOWN_CREATOR = 'Unknown'
+
+# Launch bursts are counted in the 24h and 7d windows ending now, and the
+# launch gap signal fades as the creator's latest launch ages, so scores
+# decay once a creator stops launching. The writer rescores the creators it
+# touches; workers periodically rescore everyone still above 0.
+BURST_WINDOWS = (("launches_24h", timedelta(hours=24)), ("launches_7d", timedelta(days=7)))
+# Scale of each launch signal: the value at which it reaches ~63% of its weight
+BURST_24H_SCALE = 3
+BURST_7D_SCALE = 10
+LAUNCH_GAP_SCALE = timedelta(hours=6).total_seconds()
+REPLIES_SCALE = 5
+# Age of the latest launch at which the gap signal is down to ~37%
+LAUNCH_RECENCY_SCALE = timedelta(days=3).total_seconds()
+# Launch pattern weights; they sum to 1
+FREQUENCY_WEIGHT = 0.4
+WEEKLY_WEIGHT = 0.2
+GAP_WEIGHT = 0.4
+# How much dead tokens and quiet tokens add on top of the launch pattern
+DECAY_WEIGHT = 0.25
+QUIET_WEIGHT = 0.15
+
+def _launches_within(dates, window, now):
+    """Launches among sorted `dates` in the `window` ending at `now`"""
+    return bisect_right(dates, now) - bisect_left(dates, now - window)
+
+def _saturate(value, scale):
+    return 1 - math.exp(-max(value, 0) / scale)
+
+def score_creator(tokens, now=None):
+    """Risk components and a 0-100 score for one creator's tokens as of `now`.
+
+    `tokens` are (creation_date, market_cap, peak_market_cap, comments)
+    tuples. A single launch scores 0; the score grows with recent launch
+    bursts and short gaps between launches, and is amplified when the
+    creator's tokens have lost most of their peak market cap or draw no
+    replies.
+    """
+    now = now or datetime.now()
+    dates = sorted(created for created, _, _, _ in tokens if created is not None)
+    values = {name: _launches_within(dates, window, now) for name, window in BURST_WINDOWS}
+    gaps = [(later - earlier).total_seconds() for earlier, later in zip(dates, dates[1:])]
+    values['median_launch_gap'] = median(gaps) if gaps else None
+    recency = math.exp(-max((now - dates[-1]).total_seconds(), 0) / LAUNCH_RECENCY_SCALE) if dates else 0.0
+
+    decays = [1 - (market_cap or 0) / peak for _, market_cap, peak, _ in tokens if peak]
+    values['market_cap_decay'] = sum(decays) / len(decays) if decays else 0.0
+
+    launch_pattern = (
+        FREQUENCY_WEIGHT * _saturate(values['launches_24h'] - 1, BURST_24H_SCALE)
+        + WEEKLY_WEIGHT * _saturate(values['launches_7d'] - 1, BURST_7D_SCALE)
+        + GAP_WEIGHT * recency * (math.exp(-values['median_launch_gap'] / LAUNCH_GAP_SCALE) if gaps else 0.0)
+    )
+    average_replies = sum(comments or 0 for _, _, _, comments in tokens) / len(tokens) if tokens else 0
+    quiet = 1 / (1 + average_replies / REPLIES_SCALE)
+    amplifier = 1 - DECAY_WEIGHT - QUIET_WEIGHT + DECAY_WEIGHT * values['market_cap_decay'] + QUIET_WEIGHT * quiet
+    values['risk_score'] = round(100 * launch_pattern * amplifier, 2)
+    return values
+
+def refresh_risk_scores(db, creator_addresses=None, now=None):
+    """Rescore the given creators (every creator in creator_stats if None).
+
+    Runs after refresh_creator_stats in the writer's transaction; the caller
+    commits. Peaks come from the token's snapshot history and its current
+    market cap.
+    """
+    now = now or datetime.now()
+    if creator_addresses is None:
+        creator_addresses = [address for address, in db.query(CreatorStats.creator_address).all()]
+    updated = 0
+    for batch in chunks({address for address in creator_addresses if address and address != UNKNOWN_CREATOR}):
+        peaks = db.query(
+            TokenSnapshot.token_id, func.max(TokenSnapshot.market_cap).label('peak')
+        ).join(Token, Token.id == TokenSnapshot.token_id).filter(
+            Token.creator_address.in_(batch)
+        ).group_by(TokenSnapshot.token_id).subquery()
+        rows = db.query(
+            Token.creator_address, Token.creation_date, Token.market_cap, peaks.c.peak, Token.comments
+        ).outerjoin(peaks, peaks.c.token_id == Token.id).filter(Token.creator_address.in_(batch)).all()
+
+        tokens = {}
+        for row in rows:
+            peak = max(row.peak or 0, row.market_cap or 0)
+            tokens.setdefault(row.creator_address, []).append((row.creation_date, row.market_cap, peak, row.comments))
+        scores = [dict(score_creator(creator_tokens, now), creator_address=address) for address, creator_tokens in tokens.items()]
+        if scores:
+            db.execute(update(CreatorStats), scores)
+        updated += len(scores)
+
+    logging.info(f"Refreshed risk scores for {updated} creators")
+    return updated
+
+def ensure_risk_scores(db):
+    """Score creators whose rollup row predates the risk columns"""
+    # Earlier versions scored the placeholder creator too
+    cleared = db.query(CreatorStats).filter(
+        CreatorStats.creator_address == UNKNOWN_CREATOR, CreatorStats.risk_score.isnot(None)
+    ).update({CreatorStats.risk_score: None}, synchronize_session=False)
+    unscored = [address for address, in db.query(CreatorStats.creator_address).filter(
+        CreatorStats.risk_score.is_(None), CreatorStats.creator_address != UNKNOWN_CREATOR
+    ).all()]
+    if unscored:
+        refresh_risk_scores(db, unscored)
+    if cleared or unscored:
+        db.commit()
+
+def rescore_active_creators(db, now=None):
+    """Rescore every creator whose score is above 0, so bursts that have passed decay"""
+    active = [address for address, in db.query(CreatorStats.creator_address).filter(CreatorStats.risk_score > 0).all()]
+    if active:
+        refresh_risk_scores(db, active, now)
+        # Cached leaderboard responses are invalidated through the event outbox
+        record_change(db, {'type': 'risk_scores', 'rescored': len(active)})
+    db.commit()
+    return len(active)
@@ -0,0 +1,153 @@
+import logging
+from datetime import datetime, time, timedelta
+from sqlalchemy import Date, func
+from models import Token, CreatorStats, DailyStats
+from dbutil import chunks
+
+def refresh_creator_stats(db, creator_addresses=None):
+    """Recompute creator_stats rows from the tokens table.
+
+    Only the given creators are recomputed; with no addresses the whole
+    rollup is rebuilt. The caller owns the transaction.
+    """
+    if creator_addresses is None:
+        db.query(CreatorStats).delete(synchronize_session=False)
+        batches = [None]
+    else:
+        creator_addresses = {address for address in creator_addresses if address}
+        if not creator_addresses:
+            return 0
+        batches = chunks(creator_addresses)
+
+    updated = 0
+    for batch in batches:
+        rows = db.query(
+            Token.creator_address,
+            func.max(Token.creator_name).label('creator_name'),
+            func.max(Token.creator_avatar_url).label('creator_avatar_url'),
+            func.count(Token.id).label('token_count'),
+            func.coalesce(func.sum(Token.market_cap), 0.0).label('total_market_cap'),
+            func.coalesce(func.sum(Token.comments), 0).label('total_replies'),
+            func.min(Token.creation_date).label('first_token_date'),
+            func.max(Token.creation_date).label('latest_token_date')
+        )
+        if batch is not None:
+            rows = rows.filter(Token.creator_address.in_(batch))
+        rows = rows.group_by(Token.creator_address).all()
+
+        seen = set()
+        for row in rows:
+            seen.add(row.creator_address)
+            db.merge(CreatorStats(
+                creator_address=row.creator_address,
+                creator_name=row.creator_name,
+                creator_avatar_url=row.creator_avatar_url,
+                token_count=row.token_count,
+                total_market_cap=row.total_market_cap,
+                total_replies=row.total_replies,
+                first_token_date=row.first_token_date,
+                latest_token_date=row.latest_token_date
+            ))
+            updated += 1
+
+        # Creators whose last token disappeared drop out of the rollup.
+        if batch is not None:
+            stale = set(batch) - seen
+            if stale:
+                db.query(CreatorStats).filter(
+                    CreatorStats.creator_address.in_(stale)
+                ).delete(synchronize_session=False)
+
+    logging.info(f"Refreshed creator_stats for {updated} creators")
+    return updated
+
+def _day(column):
+    return func.date(column, type_=Date)
+
+def _first_seen_days(db, creator_addresses):
+    days = set()
+    for batch in chunks({address for address in creator_addresses if address}):
+        rows = db.query(_day(CreatorStats.first_token_date)).filter(
+            CreatorStats.creator_address.in_(batch)
+        ).distinct().all()
+        days.update(day for day, in rows if day)
+    return days
+
+def refresh_daily_stats(db, days=None):
+    """Recompute daily_stats rows for the given dates (all days if None).
+
+    New creators per day come from each creator's first-seen date in
+    creator_stats, so refresh_creator_stats must run first.
+    """
+    if days is None:
+        db.query(DailyStats).delete(synchronize_session=False)
+        batches = [None]
+    else:
+        days = {day for day in days if day}
+        if not days:
+            return 0
+        batches = chunks(sorted(days))
+
+    updated = 0
+    for batch in batches:
+        token_rows = db.query(
+            _day(Token.creation_date).label('day'),
+            func.count(Token.id).label('new_tokens'),
+            func.coalesce(func.sum(Token.market_cap), 0.0).label('market_cap'),
+            func.count(func.distinct(Token.creator_address)).label('active_creators')
+        ).filter(Token.creation_date.isnot(None))
+        creator_rows = db.query(
+            _day(CreatorStats.first_token_date).label('day'),
+            func.count(CreatorStats.creator_address).label('new_creators')
+        ).filter(CreatorStats.first_token_date.isnot(None))
+        if batch is not None:
+            # The range bound lets the database use the creation_date index
+            token_rows = token_rows.filter(
+                Token.creation_date >= datetime.combine(batch[0], time.min),
+                Token.creation_date < datetime.combine(batch[-1] + timedelta(days=1), time.min),
+                _day(Token.creation_date).in_(batch)
+            )
+            creator_rows = creator_rows.filter(_day(CreatorStats.first_token_date).in_(batch))
+        new_creators = dict(creator_rows.group_by('day').all())
+
+        seen = set()
+        for row in token_rows.group_by('day').all():
+            seen.add(row.day)
+            db.merge(DailyStats(
+                date=row.day,
+                new_tokens=row.new_tokens,
+                market_cap=row.market_cap,
+                active_creators=row.active_creators,
+                new_creators=new_creators.get(row.day, 0)
+            ))
+            updated += 1
+
+        if batch is not None:
+            stale = set(batch) - seen
+            if stale:
+                db.query(DailyStats).filter(DailyStats.date.in_(stale)).delete(synchronize_session=False)
+
+    logging.info(f"Refreshed daily_stats for {updated} days")
+    return updated
+
+def refresh_rollups(db, creator_addresses, days):
+    """Refresh creator_stats and daily_stats for what a scrape touched.
+
+    A creator's first-seen day can move when an older token is found, so
+    both the old and new first-seen days are recomputed.
+    """
+    days = set(days) | _first_seen_days(db, creator_addresses)
+    refresh_creator_stats(db, creator_addresses)
+    days |= _first_seen_days(db, creator_addresses)
+    refresh_daily_stats(db, days)
+
+def ensure_rollups(db):
+    """Backfill rollup tables once for databases created before they existed."""
+    if db.query(Token.id).first() is None:
+        return
+    if db.query(CreatorStats.creator_address).first() is None:
+        refresh_creator_stats(db)
+        refresh_daily_stats(db)
+    elif db.query(DailyStats.date).first() is None:
+        refresh_daily_stats(db)
+    db.commit()
@@ -1,11 +1,19 @@
 import logging
 import json
-from models import SessionLocal, Token, ScrapedURL
-from fomobiz_to_html import create_driver, extract_token_data
+import os
+from models import SessionLocal, ScrapedURL, ScrapeJob
+from fomobiz_to_html import create_driver, extract_token_data, SELECTORS
+from driver_pool import DriverPool, SCRAPER_WORKERS
+from http_extract import fetch_all, fast_path, HTTP_FETCH_ENABLED
+from refresh_schedule import due_tokens, next_refresh_time, relative_change, retry_refresh_time
+from writer import BatchWriter
+from normalize import parse_amount, parse_count, parse_datetime
+from metrics import PAGE_LOAD_SECONDS, PAGES_SCRAPED
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
+from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 
@@ -37,88 +45,233 @@ def load_token_links(filename="token_urls.json"):
     logging.info(f"Loaded {len(urls)} token URLs from {filename}")
     return urls
 
-def scrape_and_update():
-    logging.info("Starting scrape_and_update")
+FOMO_HOME_URL = 'https://fomo.biz'
+TOKEN_LINK_SELECTOR = 'a[href*="/token/"]'
+DISCOVERY_MODE = os.getenv("DISCOVERY_MODE", "incremental")
+# Consecutive already-scraped links after which older pages are not scrolled into
+DISCOVERY_KNOWN_RUN = int(os.getenv("DISCOVERY_KNOWN_RUN", "20"))
+DISCOVERY_MAX_SCROLLS = 30
+SCROLL_WAIT_MAX = 5.0
+SCROLL_POLL_INTERVAL = 0.2
 
-    extract_and_save_token_links()
+COLLECT_LINKS_SCRIPT = f"return Array.from(document.querySelectorAll('{TOKEN_LINK_SELECTOR}'), (a) => a.href);"
+COUNT_LINKS_SCRIPT = f"return document.querySelectorAll('{TOKEN_LINK_SELECTOR}').length;"
 
-    db = SessionLocal()
-    token_links = load_token_links()
-    scraped_urls = set(url.url for url in db.query(ScrapedURL.url).all())
-    new_links = [link for link in token_links if link not in scraped_urls]
+_known_urls = None
+_discovery_driver = None
 
-    logging.info(f"{len(new_links)} new tokens to scrape this round.")
+def known_urls(db):
+    """Scraped and queued URLs, loaded from the database once and kept current by the writer"""
+    global _known_urls
+    if _known_urls is None:
+        _known_urls = set(url for url, in db.query(ScrapedURL.url).all())
+        _known_urls.update(url for url, in db.query(ScrapeJob.url).filter(ScrapeJob.kind == "scrape").all())
+        logging.info(f"Loaded {len(_known_urls)} known token URLs.")
+    return _known_urls
 
-    driver = create_driver()
-    wait = WebDriverWait(driver, 20)
+def remember_urls(urls):
+    if _known_urls is not None:
+        _known_urls.update(urls)
 
-    for idx, link in enumerate(new_links, start=1):
-        logging.info(f"Scraping token {idx}/{len(new_links)}: {link}")
-        successful_scrape = False
-
-        for attempt in range(2):
-            try:
-                driver.get(link)
-                wait.until(EC.presence_of_element_located((By.CLASS_NAME, '_tokenInfoContainer_z5b78_1')))
-                token_info = extract_token_data(driver, link)
-
-                if token_info and token_info.get('name') != 'Unknown':
-                    successful_scrape = True
-                    break
-                else:
-                    logging.warning(f"[Retry {attempt + 1}/2] incomplete data for {link}, retrying after delay...")
-                    time.sleep(3)
-            except Exception as e:
-                logging.error(f"Error scraping {link}: {e}")
-                time.sleep(3)
+def _remember_scraped(inserts, updates):
+    remember_urls(row['url'] for row in inserts)
 
-        if not successful_scrape:
-            logging.error(f"Completely failed to scrape {link} after retries, skipping.")
-            continue
+def _get_discovery_driver():
+    global _discovery_driver
+    if _discovery_driver is not None:
+        try:
+            _discovery_driver.execute_script("return 1")
+            return _discovery_driver
+        except Exception:
+            _close_discovery_driver()
+    _discovery_driver = create_driver()
+    return _discovery_driver
 
+def _close_discovery_driver():
+    global _discovery_driver
+    if _discovery_driver is not None:
         try:
-            token = Token(
-                name=token_info['name'],
-                ticker=token_info.get('ticker', 'Unknown'),
-                url=token_info.get('url', link),
-                logo_url=token_info.get('logo_url', 'Unknown'),
-                creator_address=token_info.get('creator_address', 'Unknown'),
-                creator_name=token_info.get('creator_name', 'Unknown'),
-                creator_avatar_url=token_info.get('creator_avatar_url', 'Unknown'),
-                creation_date=token_info.get('creation_date', 'Unknown'),
-                market_cap=float(token_info.get('market_cap', '0').replace('$','').replace(',','')),
-                comments=int(token_info.get('replies', '0'))
-            )
-            db.add(token)
-            db.add(ScrapedURL(url=link))
-            logging.info(f"Added new token: {token.ticker}")
-        except Exception as e:
-            logging.error(f"Unexpected error adding token {link}: {e}, data: {token_info}")
+            _discovery_driver.quit()
+        except Exception:
+            pass
+        _discovery_driver = None
 
-    driver.quit()
+def _wait_for_more_links(driver, previous_count):
+    """Poll until the page has grown past previous_count links or SCROLL_WAIT_MAX passes"""
+    deadline = time.monotonic() + SCROLL_WAIT_MAX
+    while time.monotonic() < deadline:
+        time.sleep(SCROLL_POLL_INTERVAL)
+        count = driver.execute_script(COUNT_LINKS_SCRIPT)
+        if count > previous_count:
+            return count
+    return previous_count
 
-    # === EXPLICITLY ADDED SNIPPET START (Corrected) ===
-    logging.info("Starting market cap/comments refresh for existing tokens.")
-    all_tokens = db.query(Token).all()
-    driver = create_driver()
-    wait = WebDriverWait(driver, 20)
+def discover_new_links(driver, known, known_run=DISCOVERY_KNOWN_RUN, max_scrolls=DISCOVERY_MAX_SCROLLS):
+    """Scroll the homepage only until a run of already-known links shows up.
 
-    for token in all_tokens:
-        try:
-            driver.get(token.url)
-            wait.until(EC.presence_of_element_located((By.CLASS_NAME, '_tokenInfoContainer_z5b78_1')))
-            refreshed_data = extract_token_data(driver, token.url)  # <-- Explicit fix here
-            if refreshed_data:
-                token.market_cap = float(refreshed_data.get('market_cap', '0').replace('$', '').replace(',', ''))
-                token.comments = int(refreshed_data.get('replies', '0'))
-                logging.info(f"🔄 Market cap/comments explicitly updated for {token.ticker}")
-                db.commit()
-        except Exception as e:
-            logging.error(f"Error refreshing market cap/comments for {token.url}: {e}")
+    Links are read in page order, newest first, so once `known_run` known
+    links appear in a row everything further down has been seen before.
+    """
+    driver.get(FOMO_HOME_URL)
+    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, TOKEN_LINK_SELECTOR)))
 
-    driver.quit()
-    # === EXPLICITLY ADDED SNIPPET END (Corrected) ===
+    seen = set()
+    new_links = []
+    run = 0
+    for scroll in range(max_scrolls + 1):
+        links = driver.execute_script(COLLECT_LINKS_SCRIPT)
+        for link in links:
+            if link in seen:
+                continue
+            seen.add(link)
+            if link in known:
+                run += 1
+            else:
+                run = 0
+                new_links.append(link)
+        if run >= known_run:
+            logging.info(f"Reached {run} known links after {scroll} scrolls, stopping discovery.")
+            break
+        if scroll == max_scrolls:
+            break
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        if _wait_for_more_links(driver, len(links)) == len(links):
+            break
+    return new_links
+
+def find_new_links(db):
+    """New token URLs for this cycle, handed straight to the scrape queue"""
+    known = known_urls(db)
+    if DISCOVERY_MODE != "incremental":
+        extract_and_save_token_links()
+        return [link for link in load_token_links() if link not in known]
+    try:
+        return discover_new_links(_get_discovery_driver(), known)
+    except Exception as e:
+        logging.error(f"Link discovery failed: {e}")
+        _close_discovery_driver()
+        return []
+
+def scrape_token_page(driver, link):
+    """Load one token page on a pool driver; None means the data was incomplete."""
+    with PAGE_LOAD_SECONDS.time(fetcher="browser"):
+        driver.get(link)
+        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORS['container'])))
+    token_info = extract_token_data(driver, link)
+    if token_info and token_info.get('name') not in (None, 'Unknown'):
+        PAGES_SCRAPED.inc(fetcher="browser", result="complete")
+        return token_info
+    PAGES_SCRAPED.inc(fetcher="browser", result="incomplete")
+    return None
+
+def scrape_urls(pool, urls):
+    """Yield (url, token_info) trying plain HTTP first and Selenium only for pages that need it"""
+    if not HTTP_FETCH_ENABLED or not fast_path.enabled():
+        yield from pool.run(urls, scrape_token_page)
+        return
+
+    needs_browser = []
+    for url, token_info in fetch_all(urls):
+        if token_info is not None:
+            yield url, token_info
+        else:
+            needs_browser.append(url)
+    if needs_browser:
+        logging.info(f"{len(needs_browser)} pages need the browser fallback.")
+        yield from pool.run(needs_browser, scrape_token_page)
+
+def token_values(token_info, link):
+    """Column values for a freshly scraped token"""
+    return {
+        'name': token_info['name'],
+        'ticker': token_info.get('ticker', 'Unknown'),
+        'url': link,
+        'logo_url': token_info.get('logo_url', 'Unknown'),
+        'creator_address': token_info.get('creator_address', 'Unknown'),
+        'creator_name': token_info.get('creator_name', 'Unknown'),
+        'creator_avatar_url': token_info.get('creator_avatar_url', 'Unknown'),
+        'creation_date': parse_datetime(token_info.get('creation_date')),
+        'market_cap': parse_amount(token_info.get('market_cap')) or 0.0,
+        'supply': parse_amount(token_info.get('supply')),
+        'comments': parse_count(token_info.get('replies')) or 0,
+        # Kept out of the search index when the page had none
+        'description': None if token_info.get('description') in (None, 'Unknown') else token_info['description'],
+    }
+
+def refresh_values(token, refreshed_data, refreshed_at):
+    """Column updates for a re-scraped token, rescheduled on how much it moved"""
+    market_cap = parse_amount(refreshed_data.get('market_cap'))
+    if market_cap is None:
+        raise ValueError(f"Unparseable market cap {refreshed_data.get('market_cap')!r}")
+    change = relative_change(token.market_cap, market_cap)
+    values = {
+        'market_cap': market_cap,
+        'comments': parse_count(refreshed_data.get('replies')) or 0,
+        'last_refreshed_at': refreshed_at,
+        'next_refresh_at': next_refresh_time(market_cap, token.creation_date, refreshed_at, change),
+    }
+    supply = parse_amount(refreshed_data.get('supply'))
+    if supply is not None:
+        values['supply'] = supply
+    return values
+
+def scrape_and_update(workers=SCRAPER_WORKERS):
+    """One in-process discovery and refresh cycle, without the job queue (see worker.py)"""
+    logging.info("Starting scrape_and_update")
+
+    db = SessionLocal()
+    new_links = find_new_links(db)
+
+    logging.info(f"{len(new_links)} new tokens to scrape this round with {workers} workers.")
+
+    # Workers only fetch pages; this thread is the single database writer.
+    # Drivers start lazily, so Chrome only launches if HTTP parsing falls short.
+    with DriverPool(size=workers) as pool, BatchWriter(db) as writer:
+        writer.on_commit.append(_remember_scraped)
+        for idx, (link, token_info) in enumerate(scrape_urls(pool, new_links), start=1):
+            logging.info(f"Scraped token {idx}/{len(new_links)}: {link}")
+
+            if token_info is None:
+                logging.error(f"Completely failed to scrape {link} after retries, skipping.")
+                continue
+
+            try:
+                values = token_values(token_info, link)
+                now = datetime.now()
+                values['last_refreshed_at'] = now
+                values['next_refresh_at'] = next_refresh_time(values['market_cap'], values['creation_date'], now)
+                writer.upsert_token(values)
+                logging.info(f"Added new token: {values['ticker']}")
+            except Exception as e:
+                logging.error(f"Unexpected error adding token {link}: {e}, data: {token_info}")
+        writer.flush()
+
+        # === EXPLICITLY ADDED SNIPPET START (Corrected) ===
+        # Only tokens whose tier interval has elapsed are refreshed, in a
+        # bounded batch, so cycle time does not grow with the table.
+        now = datetime.now()
+        tokens_by_url = {token.url: token for token in due_tokens(db, now)}
+        logging.info(f"Refreshing market cap/comments for {len(tokens_by_url)} due tokens.")
+
+        for url, refreshed_data in scrape_urls(pool, list(tokens_by_url)):
+            token = tokens_by_url[url]
+            try:
+                if not refreshed_data:
+                    raise ValueError("page could not be scraped")
+                writer.update_token(token.id, refresh_values(token, refreshed_data, datetime.now()),
+                                    token.creator_address, token.creation_date)
+                logging.info(f"🔄 Market cap/comments explicitly updated for {token.ticker}")
+            except Exception as e:
+                logging.error(f"Error refreshing market cap/comments for {token.url}: {e}")
+                # Failed tokens back off instead of heading every later batch
+                writer.update_token(token.id, {
+                    'next_refresh_at': retry_refresh_time(
+                        token.market_cap, token.creation_date, token.last_refreshed_at, datetime.now()
+                    ),
+                })
+        # === EXPLICITLY ADDED SNIPPET END (Corrected) ===
 
-    db.commit()
     db.close()
-    logging.info("Scraping completed and data committed.")
\ No newline at end of file
+    if writer.total_seconds:
+        logging.info(f"Wrote {writer.total_rows} rows at {writer.total_rows / writer.total_seconds:.0f} rows/s.")
+    logging.info("Scraping completed and data committed.")
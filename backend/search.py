@@ -0,0 +1,73 @@
+import re
+from sqlalchemy import and_, asc, column, desc, func, literal_column, or_, select, table, text
+from models import engine, Token, CreatorStats, SEARCH_TABLE, SEARCH_COLUMNS
+
+SEARCH_MAX_TERMS = 8
+# bm25 weights in SEARCH_COLUMNS order: name and ticker hits outrank the rest
+SEARCH_WEIGHTS = (10.0, 10.0, 4.0, 4.0, 1.0)
+CREATOR_COLUMNS = ("creator_name", "creator_address")
+TOKEN_RESULT_COLUMNS = (
+    Token.id, Token.name, Token.ticker, Token.url, Token.logo_url,
+    Token.creator_address, Token.creator_name, Token.creation_date, Token.market_cap, Token.comments,
+)
+
+_search_table = table(SEARCH_TABLE, column("rowid"))
+
+def search_terms(q):
+    """Words of a free-text query, split the way the FTS tokenizer splits text"""
+    return [term for term in re.split(r"[\W_]+", q) if term][:SEARCH_MAX_TERMS]
+
+def match_expression(terms, columns=None):
+    """FTS5 query in which every term must match as a word prefix"""
+    expression = " ".join(f'"{term}"*' for term in terms)
+    if columns:
+        expression = "{" + " ".join(columns) + "} : (" + expression + ")"
+    return expression
+
+def _fts_match(terms, columns=None):
+    score = func.bm25(literal_column(SEARCH_TABLE), *SEARCH_WEIGHTS).label("score")
+    match = text(f"{SEARCH_TABLE} MATCH :match").bindparams(match=match_expression(terms, columns))
+    return score, match
+
+def _like_match(terms, columns):
+    # Without FTS (PostgreSQL) every term must appear somewhere in the columns
+    return and_(*[
+        or_(*[getattr(Token, name).ilike(f"%{term}%") for name in columns]) for term in terms
+    ])
+
+def token_search_query(terms, limit):
+    """Tokens matching all terms, best match first"""
+    if engine.dialect.name != "sqlite":
+        return select(*TOKEN_RESULT_COLUMNS, literal_column("0.0").label("score")).filter(
+            _like_match(terms, SEARCH_COLUMNS)
+        ).order_by(desc(Token.market_cap), asc(Token.id)).limit(limit)
+
+    score, match = _fts_match(terms)
+    return select(*TOKEN_RESULT_COLUMNS, score).select_from(
+        _search_table.join(Token, Token.id == _search_table.c.rowid)
+    ).filter(match).order_by(score, asc(Token.id)).limit(limit)
+
+def creator_search_query(terms, limit):
+    """Creators whose name or address matches all terms, best match first.
+
+    Creator fields are indexed on each of their tokens, so a creator ranks
+    by its best matching token row.
+    """
+    if engine.dialect.name != "sqlite":
+        matches = select(Token.creator_address, literal_column("0.0").label("score")).filter(
+            _like_match(terms, CREATOR_COLUMNS)
+        ).subquery()
+    else:
+        # Materialized so SQLite does not fold bm25() into the GROUP BY below,
+        # where it cannot be evaluated
+        score, match = _fts_match(terms, CREATOR_COLUMNS)
+        matches = select(Token.creator_address, score).select_from(
+            _search_table.join(Token, Token.id == _search_table.c.rowid)
+        ).filter(match).cte("creator_matches").prefix_with("MATERIALIZED")
+
+    best = select(matches.c.creator_address, func.min(matches.c.score).label("score")).group_by(
+        matches.c.creator_address
+    ).subquery()
+    return select(CreatorStats, best.c.score).join(
+        best, best.c.creator_address == CreatorStats.creator_address
+    ).order_by(best.c.score, desc(CreatorStats.token_count)).limit(limit)
@@ -0,0 +1,138 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, insert
+from models import Token, TokenSnapshot
+from refresh_schedule import relative_change
+from dbutil import chunks
+from events import record_change
+
+# Relative market cap move that earns a new point; reply count changes always do
+SNAPSHOT_MIN_CHANGE = float(os.getenv("SNAPSHOT_MIN_CHANGE", "0.01"))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "365"))
+
+# (resolution, bucket size, age after which points are folded into the next tier)
+TIERS = (
+    ("raw", None, timedelta(days=1)),
+    ("5m", timedelta(minutes=5), timedelta(days=7)),
+    ("1h", timedelta(hours=1), timedelta(days=90)),
+    ("1d", timedelta(days=1), None),
+)
+RESOLUTIONS = tuple(resolution for resolution, _, _ in TIERS)
+DOWNSAMPLE_BATCH_SIZE = 5000
+
+def _latest_points(db, token_ids):
+    """The newest snapshot of each token, as {token_id: (market_cap, comments)}"""
+    latest = {}
+    for batch in chunks(token_ids):
+        newest = db.query(
+            TokenSnapshot.token_id, func.max(TokenSnapshot.taken_at).label('taken_at')
+        ).filter(TokenSnapshot.token_id.in_(batch)).group_by(TokenSnapshot.token_id).subquery()
+        rows = db.query(TokenSnapshot.token_id, TokenSnapshot.market_cap, TokenSnapshot.comments).join(
+            newest, and_(TokenSnapshot.token_id == newest.c.token_id, TokenSnapshot.taken_at == newest.c.taken_at)
+        ).all()
+        latest.update((row.token_id, (row.market_cap, row.comments)) for row in rows)
+    return latest
+
+def record_snapshots(db, inserts, updates, now=None):
+    """Append points for a writer batch where market cap or replies moved enough.
+
+    Runs inside the writer's transaction, after its upserts, so new tokens
+    already have ids.
+    """
+    now = now or datetime.now()
+    values = {}
+    if inserts:
+        for batch in chunks(row['url'] for row in inserts):
+            ids = dict(db.query(Token.url, Token.id).filter(Token.url.in_(batch)).all())
+            for row in inserts:
+                if row['url'] in ids:
+                    values[ids[row['url']]] = (row.get('market_cap'), row.get('comments'))
+    for row in updates:
+        if 'market_cap' in row:
+            values[row['id']] = (row['market_cap'], row.get('comments'))
+    if not values:
+        return 0
+
+    latest = _latest_points(db, values)
+    points = []
+    for token_id, (market_cap, comments) in values.items():
+        previous = latest.get(token_id)
+        if previous is not None:
+            previous_market_cap, previous_comments = previous
+            if relative_change(previous_market_cap, market_cap or 0) < SNAPSHOT_MIN_CHANGE and previous_comments == comments:
+                continue
+        points.append({
+            'token_id': token_id, 'resolution': 'raw', 'taken_at': now,
+            'market_cap': market_cap, 'comments': comments,
+        })
+    if points:
+        db.execute(insert(TokenSnapshot), points)
+    return len(points)
+
+def _floor(moment, size):
+    epoch = datetime(2000, 1, 1)
+    return moment - (moment - epoch) % size
+
+def _point_columns():
+    return (TokenSnapshot.id, TokenSnapshot.token_id, TokenSnapshot.taken_at,
+            TokenSnapshot.market_cap, TokenSnapshot.comments)
+
+def _bucket_rows(db, resolution, start, end):
+    return db.query(*_point_columns()).filter(
+        TokenSnapshot.resolution == resolution, TokenSnapshot.taken_at >= start, TokenSnapshot.taken_at < end
+    ).order_by(TokenSnapshot.taken_at).all()
+
+def _downsample_tier(db, source, target, size, cutoff):
+    """Fold `source` points older than `cutoff` into one `target` point per token and bucket.
+
+    A bucket keeps the last value inside it. The cutoff is aligned to the
+    bucket size so a bucket is never split across two runs.
+    """
+    cutoff = _floor(cutoff, size)
+    folded = 0
+    while True:
+        rows = db.query(*_point_columns()).filter(
+            TokenSnapshot.resolution == source, TokenSnapshot.taken_at < cutoff
+        ).order_by(TokenSnapshot.taken_at).limit(DOWNSAMPLE_BATCH_SIZE).all()
+        if not rows:
+            return folded
+        # A batch can end in the middle of a bucket; only whole buckets are
+        # folded unless the batch holds everything that is left.
+        if len(rows) == DOWNSAMPLE_BATCH_SIZE:
+            last_bucket = _floor(rows[-1].taken_at, size)
+            rows = [row for row in rows if _floor(row.taken_at, size) < last_bucket] or _bucket_rows(
+                db, source, last_bucket, last_bucket + size
+            )
+
+        buckets = {}
+        for row in rows:
+            buckets[(row.token_id, _floor(row.taken_at, size))] = row
+        db.execute(insert(TokenSnapshot), [
+            {'token_id': token_id, 'resolution': target, 'taken_at': bucket,
+             'market_cap': row.market_cap, 'comments': row.comments}
+            for (token_id, bucket), row in buckets.items()
+        ])
+        for batch in chunks(row.id for row in rows):
+            db.query(TokenSnapshot).filter(TokenSnapshot.id.in_(batch)).delete(synchronize_session=False)
+        db.commit()
+        folded += len(rows)
+
+def downsample_snapshots(db, now=None):
+    """Move aged points down the tiers and drop daily points past the retention window"""
+    now = now or datetime.now()
+    total_folded = 0
+    for (source, _, max_age), (target, size, _) in zip(TIERS, TIERS[1:]):
+        folded = _downsample_tier(db, source, target, size, now - max_age)
+        if folded:
+            logging.info(f"Downsampled {folded} {source} snapshots to {target}.")
+        total_folded += folded
+    expired = db.query(TokenSnapshot).filter(
+        TokenSnapshot.resolution == RESOLUTIONS[-1],
+        TokenSnapshot.taken_at < now - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    if total_folded or expired:
+        # Cached history responses are invalidated through the event outbox
+        record_change(db, {'type': 'snapshots', 'downsampled': total_folded, 'expired': expired})
+    db.commit()
+    return expired
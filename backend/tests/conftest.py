@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The app reads its configuration at import time, so every test module
+# shares one temporary database and media directory
+_directory = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_directory}/test.db"
+os.environ["MEDIA_CACHE_DIR"] = os.path.join(_directory, "media")
+os.environ.pop("MEDIA_PUBLIC_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import timedelta
+from sqlalchemy import func, select
+from events import commit_events, follow_events, prune_events, record_change
+from models import SessionLocal, ScrapeEvent
+
+def _record(count):
+    with SessionLocal() as db:
+        for number in range(count):
+            record_change(db, {'type': 'test', 'number': number})
+        db.commit()
+        return db.scalar(select(func.max(ScrapeEvent.id)))
+
+def _follow(after_id):
+    """Events follow_events delivers to a listener in its first polls"""
+    delivered = []
+
+    async def listener(events):
+        delivered.extend(events)
+
+    async def follow():
+        task = asyncio.create_task(follow_events(poll_seconds=0.01, listeners=[listener], after_id=after_id))
+        for _ in range(100):
+            if delivered:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(follow())
+    return delivered
+
+def test_events_after_a_full_prune_are_still_delivered():
+    last_id = _record(5)
+    with SessionLocal() as db:
+        prune_events(db, older_than=timedelta(0))
+    new_id = _record(1)
+    assert new_id > last_id
+    assert _follow(last_id) == [{'type': 'test', 'number': 0}]
+
+def test_follower_resyncs_when_ids_go_back():
+    last_id = _record(1)
+    with SessionLocal() as db:
+        db.query(ScrapeEvent).delete()
+        db.commit()
+    assert _follow(last_id + 100) == [{'type': 'resync'}]
+
+def test_market_cap_events_carry_the_creator():
+    events = commit_events([], [{'id': 7, 'market_cap': 1200.0, 'comments': 3, 'creator_address': 'creator'}])
+    assert events == [{'type': 'market_cap', 'id': 7, 'creator_address': 'creator', 'market_cap': 1200.0, 'comments': 3}]
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+import main
+from cache import ResponseCache
+from media import media_hash
+from models import SessionLocal
+from writer import BatchWriter
+
+LOGO_URL = "https://cdn.example.com/logo.png"
+AVATAR_URL = "https://cdn.example.com/avatar.png"
+
+def setup_module():
+    db = SessionLocal()
+    with BatchWriter(db) as writer:
+        writer.upsert_token({
+            'url': 'https://fomo.biz/token/test', 'name': 'Test', 'ticker': 'TST',
+            'creator_address': 'creator1', 'creator_name': 'Creator',
+            'creator_avatar_url': AVATAR_URL, 'logo_url': LOGO_URL,
+            'creation_date': datetime.now(), 'market_cap': 1000.0, 'comments': 1,
+        })
+    db.close()
+
+def test_cached_responses_do_not_carry_the_request_host(monkeypatch):
+    stored = []
+    put = ResponseCache.put
+    monkeypatch.setattr(ResponseCache, "put", lambda self, key, *args: stored.append(key) or put(self, key, *args))
+    with TestClient(main.app) as client:
+        first = client.get("/api/v1/tokens", headers={"Host": "evil.example"})
+        second = client.get("/api/v1/tokens", headers={"Host": "api.example"})
+    assert first.status_code == second.status_code == 200
+    # The second host was answered from the entry the first one stored
+    assert stored == ["/api/v1/tokens?"]
+    assert first.content == second.content
+    for response in (first, second):
+        assert "evil.example" not in response.text
+        token, = response.json()
+        assert token['logo_url'] == f"/api/v1/media/{media_hash(LOGO_URL)}"
+        assert token['creator_avatar_url'] == f"/api/v1/media/{media_hash(AVATAR_URL)}"
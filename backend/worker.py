@@ -0,0 +1,211 @@
+"""Standalone scraper worker.
+
+Workers coordinate only through the database: new and due token pages are
+queued in scrape_jobs, each worker leases a batch at a time, and a shared
+lock lets a single worker at a time run homepage discovery. Start as many
+as needed next to any number of API processes:
+
+    python worker.py --workers 3
+"""
+import argparse
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from models import SessionLocal, Token
+from driver_pool import DriverPool, SCRAPER_WORKERS
+from events import prune_events
+from snapshots import downsample_snapshots
+from risk import rescore_active_creators
+from jobs import (
+    SCRAPE, REFRESH, Heartbeat, claim, complete, enqueue, fail, queue_depth_query, release_lock, try_lock,
+)
+from metrics import JOB_QUEUE_DEPTH, start_http_server
+from refresh_schedule import due_tokens, next_refresh_time
+from scraper import find_new_links, refresh_values, remember_urls, scrape_urls, token_values
+from writer import BatchWriter
+
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "50"))
+DISCOVERY_INTERVAL = timedelta(seconds=int(os.getenv("DISCOVERY_INTERVAL_SECONDS", "30")))
+DISCOVERY_LOCK_TTL = timedelta(minutes=10)
+DISCOVERY_LOCK = "discovery"
+RISK_RESCORE_INTERVAL = timedelta(minutes=int(os.getenv("RISK_RESCORE_INTERVAL_MINUTES", "15")))
+RISK_RESCORE_LOCK_TTL = timedelta(minutes=10)
+RISK_RESCORE_LOCK = "risk_rescore"
+IDLE_SLEEP_SECONDS = 5
+# Back-off after a failed iteration doubles per consecutive failure up to this
+ERROR_SLEEP_MAX_SECONDS = 300
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+
+logging.basicConfig(level=logging.INFO)
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def enqueue_due_refreshes(db, now):
+    """Queue refresh jobs for due tokens and push their schedule out by one interval.
+
+    A refresh that succeeds reschedules the token on how much it moved; one
+    that fails or dies leaves this schedule, so the token is queued again
+    once its normal interval has passed.
+    """
+    due = due_tokens(db, now)
+    if not due:
+        return 0
+    enqueue(db, REFRESH, [token.url for token in due], now)
+    db.execute(update(Token), [
+        {'id': token.id, 'next_refresh_at': next_refresh_time(token.market_cap, token.creation_date, now)}
+        for token in due
+    ])
+    db.commit()
+    return len(due)
+
+def run_discovery(db, worker_id):
+    """Queue new and due pages, if no other worker is doing so and the last run is old enough"""
+    try:
+        if not try_lock(db, DISCOVERY_LOCK, worker_id, DISCOVERY_LOCK_TTL, DISCOVERY_INTERVAL):
+            return False
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Could not take the discovery lock: {e}")
+        return False
+    try:
+        new_links = find_new_links(db)
+        enqueue(db, SCRAPE, new_links)
+        remember_urls(new_links)
+        refreshes = enqueue_due_refreshes(db, datetime.now())
+        logging.info(f"Queued {len(new_links)} new tokens and {refreshes} refreshes.")
+        prune_events(db)
+        downsample_snapshots(db)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Discovery run failed: {e}")
+    finally:
+        release_lock(db, DISCOVERY_LOCK, worker_id)
+    return True
+
+def run_rescoring(db, worker_id):
+    """Rescore scored creators as their launches age, if no other worker did so recently"""
+    try:
+        if not try_lock(db, RISK_RESCORE_LOCK, worker_id, RISK_RESCORE_LOCK_TTL, RISK_RESCORE_INTERVAL):
+            return False
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Could not take the risk rescore lock: {e}")
+        return False
+    try:
+        rescore_active_creators(db)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Risk rescore failed: {e}")
+    finally:
+        release_lock(db, RISK_RESCORE_LOCK, worker_id)
+    return True
+
+def process_batch(db, pool, worker_id, limit=JOB_BATCH_SIZE):
+    """Lease a batch of jobs, scrape it and write the results; returns the number of jobs claimed"""
+    owner = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    batch = claim(db, owner, limit)
+    if not batch:
+        return 0
+    logging.info(f"Claimed {len(batch)} jobs as {owner}.")
+
+    jobs_by_url = {job.url: job for job in batch}
+    tokens = {
+        token.url: token for token in db.query(
+            Token.id, Token.url, Token.market_cap, Token.creation_date, Token.creator_address
+        ).filter(Token.url.in_([job.url for job in batch if job.kind == REFRESH])).all()
+    }
+    refresh_jobs = {tokens[job.url].id: job for job in batch if job.kind == REFRESH and job.url in tokens}
+
+    def complete_written(inserts, updates):
+        # Jobs are marked done in the transaction that writes their rows
+        done = [jobs_by_url[row['url']].id for row in inserts if row['url'] in jobs_by_url]
+        done += [refresh_jobs[row['id']].id for row in updates if row['id'] in refresh_jobs]
+        complete(db, done)
+
+    failed = []
+    with Heartbeat(owner), BatchWriter(db) as writer:
+        writer.before_commit.append(complete_written)
+        for url, token_info in scrape_urls(pool, list(jobs_by_url)):
+            job = jobs_by_url[url]
+            if token_info is None:
+                failed.append((job, "page could not be scraped"))
+                continue
+            try:
+                now = datetime.now()
+                if job.kind == SCRAPE:
+                    values = token_values(token_info, url)
+                    values['last_refreshed_at'] = now
+                    values['next_refresh_at'] = next_refresh_time(values['market_cap'], values['creation_date'], now)
+                    writer.upsert_token(values)
+                elif url in tokens:
+                    token = tokens[url]
+                    writer.update_token(token.id, refresh_values(token, token_info, now),
+                                        token.creator_address, token.creation_date)
+                else:
+                    failed.append((job, "token no longer exists"))
+            except Exception as e:
+                failed.append((job, str(e)))
+
+    for job, error in failed:
+        fail(db, [job], error)
+    logging.info(f"Finished batch {owner}: {len(batch) - len(failed)} written, {len(failed)} failed.")
+    return len(batch)
+
+def collect_queue_depth():
+    db = SessionLocal()
+    try:
+        rows = db.execute(queue_depth_query()).all()
+        JOB_QUEUE_DEPTH.replace({(kind, status): count for kind, status, count in rows})
+    finally:
+        db.close()
+
+def run_worker(worker_id=None, workers=SCRAPER_WORKERS, once=False):
+    """Alternate discovery attempts and job batches; with `once`, stop when the queue is drained"""
+    worker_id = worker_id or default_worker_id()
+    logging.info(f"Starting scraper worker {worker_id} with {workers} drivers.")
+    db = SessionLocal()
+    try:
+        # Drivers start lazily and are shared across batches
+        with DriverPool(size=workers) as pool:
+            failures = 0
+            while True:
+                try:
+                    run_discovery(db, worker_id)
+                    run_rescoring(db, worker_id)
+                    claimed = process_batch(db, pool, worker_id)
+                except Exception as e:
+                    # The batch's jobs are picked up again once their leases expire
+                    db.rollback()
+                    pool.reset()
+                    failures += 1
+                    delay = min(IDLE_SLEEP_SECONDS * 2 ** (failures - 1), ERROR_SLEEP_MAX_SECONDS)
+                    logging.error(f"Worker iteration failed ({failures} in a row), retrying in {delay}s: {e}")
+                    time.sleep(delay)
+                    continue
+                failures = 0
+                if claimed:
+                    continue
+                if once:
+                    break
+                time.sleep(IDLE_SLEEP_SECONDS)
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape fomo.biz tokens from the shared job queue.")
+    parser.add_argument("--workers", type=int, default=SCRAPER_WORKERS, help="Chrome drivers in this process")
+    parser.add_argument("--worker-id", default=None, help="name used for leases and locks (default: host-pid)")
+    parser.add_argument("--once", action="store_true", help="exit once no job is claimable")
+    parser.add_argument("--metrics-port", type=int, default=WORKER_METRICS_PORT, help="serve /metrics here (0 disables)")
+    args = parser.parse_args()
+    if args.metrics_port:
+        start_http_server(args.metrics_port, before_render=collect_queue_depth)
+    run_worker(args.worker_id, args.workers, args.once)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import logging
+import os
+import time
+from sqlalchemy import update
+from models import Token, ScrapedURL, MediaSource
+from rollups import refresh_rollups
+from dbutil import chunks, upsert_insert
+from risk import refresh_risk_scores
+from events import record_events
+from snapshots import record_snapshots
+from media import media_sources
+from metrics import COMMIT_SECONDS, FAILED_BATCHES, ROWS_WRITTEN
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+WRITE_BATCH_SECONDS = float(os.getenv("WRITE_BATCH_SECONDS", "5"))
+
+def _token_ids(db, urls):
+    """{url: id} of the stored tokens among `urls`"""
+    ids = {}
+    for batch in chunks(urls):
+        ids.update(db.query(Token.url, Token.id).filter(Token.url.in_(batch)).all())
+    return ids
+
+def _stored_tokens(db, urls):
+    """{url: (id, creator_address, creation_date)} of the stored tokens among `urls`"""
+    stored = {}
+    for batch in chunks(urls):
+        rows = db.query(Token.url, Token.id, Token.creator_address, Token.creation_date).filter(Token.url.in_(batch))
+        stored.update((row.url, (row.id, row.creator_address, row.creation_date)) for row in rows)
+    return stored
+
+def _split_upserts(inserts, existing, ids):
+    """Upserted rows as (rows that created a token, with its id, and market cap updates of the others)"""
+    created, refreshed = [], []
+    for row in inserts:
+        token_id = ids.get(row['url'])
+        if token_id is None:
+            continue
+        if row['url'] in existing:
+            if 'market_cap' in row:
+                refreshed.append({
+                    'id': token_id, 'market_cap': row['market_cap'], 'comments': row.get('comments'),
+                    'creator_address': row.get('creator_address'),
+                })
+        else:
+            created.append(dict(row, id=token_id))
+            # A url queued twice in one batch is new only the first time
+            existing.add(row['url'])
+    return created, refreshed
+
+class BatchWriter:
+    """Buffers scraper writes and commits them in batched transactions.
+
+    New tokens are upserted on Token.url, so re-scraping a URL updates the
+    row instead of failing, and the matching ScrapedURL row goes into the
+    same transaction. A batch is committed once `batch_size` rows are
+    pending or the oldest pending row is `max_seconds` old. Rollups for the
+    touched creators and days are refreshed, market cap snapshots recorded,
+    the touched creators' risk scores recomputed and the batch's events
+    appended to the outbox before each commit. `before_commit` callbacks
+    run inside the same transaction and `on_commit` callbacks after it.
+    Image URLs are registered for the media proxy in the same transaction.
+    """
+
+    def __init__(self, db, batch_size=WRITE_BATCH_SIZE, max_seconds=WRITE_BATCH_SECONDS):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_seconds = max_seconds
+        self.before_commit = []
+        self.on_commit = []
+        self._inserts = []
+        self._updates = []
+        # {token id: creator address} of the queued updates, for their events
+        self._update_creators = {}
+        self._creators = set()
+        self._days = set()
+        self._started = None
+        self.total_rows = 0
+        self.total_seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def pending(self):
+        return len(self._inserts) + len(self._updates)
+
+    def upsert_token(self, values):
+        """Queue a full token row keyed on its url"""
+        self._inserts.append(values)
+        self._touch(values.get('creator_address'), values.get('creation_date'))
+
+    def update_token(self, token_id, values, creator_address=None, creation_date=None):
+        """Queue an update of some columns of an existing token"""
+        self._updates.append(dict(values, id=token_id))
+        self._update_creators[token_id] = creator_address
+        self._touch(creator_address, creation_date)
+
+    def _touch(self, creator_address, creation_date):
+        if self._started is None:
+            self._started = time.monotonic()
+        if creator_address:
+            self._creators.add(creator_address)
+        if creation_date:
+            self._days.add(creation_date.date())
+        if self.pending() >= self.batch_size or time.monotonic() - self._started >= self.max_seconds:
+            self.flush()
+
+    def flush(self):
+        if not self.pending():
+            return
+        inserts, updates = self._inserts, self._updates
+        creators, days = self._creators, self._days
+        update_creators = self._update_creators
+        self._inserts, self._updates, self._update_creators = [], [], {}
+        self._creators, self._days = set(), set()
+        self._started = None
+
+        started = time.perf_counter()
+        try:
+            created, refreshed = [], []
+            if inserts:
+                urls = {row['url'] for row in inserts}
+                stored = _stored_tokens(self.db, urls)
+                # An upsert can move a token to another creator or day, so
+                # the ones it leaves need their rollups refreshed as well
+                for _, creator_address, creation_date in stored.values():
+                    if creator_address:
+                        creators.add(creator_address)
+                    if creation_date:
+                        days.add(creation_date.date())
+                existing = {url: token_id for url, (token_id, _, _) in stored.items()}
+                statement = upsert_insert(self.db, Token)
+                columns = {key for row in inserts for key in row if key != 'url'}
+                statement = statement.on_conflict_do_update(
+                    index_elements=[Token.url],
+                    set_={column: statement.excluded[column] for column in columns}
+                )
+                self.db.execute(statement, inserts)
+                scraped = upsert_insert(self.db, ScrapedURL).on_conflict_do_nothing(index_elements=[ScrapedURL.url])
+                self.db.execute(scraped, [{'url': row['url']} for row in inserts])
+                sources = media_sources(inserts)
+                if sources:
+                    media = upsert_insert(self.db, MediaSource).on_conflict_do_nothing(index_elements=[MediaSource.hash])
+                    self.db.execute(media, sources)
+                ids = {**existing, **_token_ids(self.db, urls - existing.keys())}
+                created, refreshed = _split_upserts(inserts, set(existing), ids)
+            if updates:
+                # ORM bulk UPDATE by primary key, executed as one executemany
+                self.db.execute(update(Token), updates)
+            refresh_rollups(self.db, creators, days)
+            record_snapshots(self.db, inserts, updates)
+            refresh_risk_scores(self.db, creators)
+            # Only tokens this batch created are announced as new
+            updated = [dict(row, creator_address=update_creators.get(row['id'])) for row in updates]
+            record_events(self.db, created, updated + refreshed)
+            for callback in self.before_commit:
+                callback(inserts, updates)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            FAILED_BATCHES.inc()
+            logging.error(f"Failed to commit batch of {len(inserts) + len(updates)} rows: {e}")
+            return
+
+        elapsed = time.perf_counter() - started
+        COMMIT_SECONDS.observe(elapsed)
+        ROWS_WRITTEN.inc(len(inserts), operation="upsert")
+        ROWS_WRITTEN.inc(len(updates), operation="update")
+        rows = len(inserts) + len(updates)
+        self.total_rows += rows
+        self.total_seconds += elapsed
+        logging.info(
+            f"Committed batch: {len(inserts)} upserts, {len(updates)} updates in {elapsed * 1000:.1f} ms "
+            f"({rows / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        for callback in self.on_commit:
+            callback(inserts, updates)
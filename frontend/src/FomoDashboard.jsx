@@ -12,9 +12,31 @@ import {
 // API configuration
 const API_BASE_URL = `${import.meta.env.VITE_BACKEND_URL}`;
 
-
-// WebSocket connection
-let ws = null;
+// The API returns image URLs relative to itself (its /api/v1/media proxy)
+const mediaUrl = (url) => (url && url.startsWith('/') ? `${API_BASE_URL}${url}` : url);
+
+
+// Live event stream connection
+let eventSource = null;
+
+// Creators touched by live events are refetched together, at most once per
+// delay, along with the stats cards; events only patch loaded token lists.
+const LIVE_REFRESH_DELAY_MS = 2000;
+let liveRefreshTimer = null;
+const staleCreators = new Set();
+
+const creatorRow = (creator) => ({
+  address: creator.creator_address,
+  name: creator.creator_name || 'N/A',
+  avatar_url: creator.creator_avatar_url && creator.creator_avatar_url !== "Unknown"
+    ? mediaUrl(creator.creator_avatar_url)
+    : null,
+  token_count: creator.token_count,
+  total_market_cap: creator.total_market_cap,
+  total_replies: creator.total_replies,
+  first_token_date: creator.first_token_date,
+  latest_token_date: creator.latest_token_date
+});
 
 const FomoDashboard = () => {
   // State management
@@ -89,37 +111,61 @@ useEffect(() => {
   fetchStatsHistory(); // add this
 }, []);
 
+  // Creator rows come from the creator_stats rollup; a creator's tokens are
+  // fetched a page at a time when asked for, never the whole table.
+const TOKEN_FIELDS = 'id,ticker,url,creator_address,creator_name,creator_avatar_url,creation_date,market_cap,comments';
+const CREATOR_TOKENS_PAGE_SIZE = 50;
+const loadCreatorTokens = async (address) => {
+  const creator = creators.find(c => c.address === address);
+  if (!creator || creator.tokensLoading) return;
+  const updateCreator = (changes) => {
+    const apply = list => list.map(c => c.address === address ? { ...c, ...changes(c) } : c);
+    setCreators(apply);
+    setFilteredCreators(apply);
+  };
+  updateCreator(() => ({ tokensLoading: true }));
+  try {
+    const params = new URLSearchParams({
+      creator: address, limit: String(CREATOR_TOKENS_PAGE_SIZE), fields: TOKEN_FIELDS, sort_by: 'creation_date', order: 'desc'
+    });
+    if (creator.tokensCursor) params.set('cursor', creator.tokensCursor);
+    const response = await fetch(`${API_BASE_URL}/api/v1/tokens?${params}`);
+    const page = await response.json();
+    const nextCursor = response.headers.get('X-Next-Cursor');
+    updateCreator(c => {
+      const known = new Set(c.tokens.map(t => t.id));
+      return {
+        tokens: [...c.tokens, ...page.filter(t => !known.has(t.id))],
+        tokensCursor: nextCursor,
+        tokensComplete: !nextCursor,
+        tokensLoading: false
+      };
+    });
+  } catch (error) {
+    console.error('Error fetching creator tokens:', error);
+    updateCreator(() => ({ tokensLoading: false }));
+  }
+};
+
   // Fetch creators data
 const fetchCreators = async (sortByParam = sortBy, orderByParam = orderBy) => {
   setLoading(true);
   try {
-    const [tokensRes, creatorsRes, statsRes] = await Promise.all([
-      fetch(`${API_BASE_URL}/api/v1/tokens`),
+    const [creatorsRes, statsRes] = await Promise.all([
       fetch(`${API_BASE_URL}/api/v1/creators?sort_by=${sortByParam}&order=${orderByParam}`),
       fetch(`${API_BASE_URL}/api/v1/stats`)
     ]);
 
-    const tokensData = await tokensRes.json();
     const creatorsData = await creatorsRes.json();
     const statsData = await statsRes.json();
 
-    const updatedCreators = creatorsData.map((creator) => {
-      const creatorTokens = tokensData.filter(token => token.creator_address === creator.creator_address);
-
-      return {
-        address: creator.creator_address,
-        name: creatorTokens[0]?.creator_name || 'N/A',
-        avatar_url: creatorTokens[0]?.creator_avatar_url && creatorTokens[0].creator_avatar_url !== "Unknown"
-          ? creatorTokens[0].creator_avatar_url
-          : null,
-        tokens: creatorTokens,
-        token_count: creatorTokens.length,
-        total_market_cap: creatorTokens.reduce((acc, token) => acc + token.market_cap, 0),
-        total_replies: creatorTokens.reduce((acc, token) => acc + token.comments, 0),
-        first_token_date: creatorTokens.sort((a, b) => new Date(a.creation_date) - new Date(b.creation_date))[0]?.creation_date,
-        latest_token_date: creatorTokens.sort((a, b) => new Date(b.creation_date) - new Date(a.creation_date))[0]?.creation_date
-      };
-    });
+    const updatedCreators = creatorsData.map((creator) => ({
+      ...creatorRow(creator),
+      tokens: [],
+      tokensCursor: null,
+      tokensComplete: false,
+      tokensLoading: false
+    }));
 
     setCreators(updatedCreators);
     setFilteredCreators(updatedCreators);
@@ -137,52 +183,87 @@ const fetchCreators = async (sortByParam = sortBy, orderByParam = orderBy) => {
   }
 };
 
-  // Initialize WebSocket connection
-  const initWebSocket = () => {
-    if (ws) return;
+  // Refetch the rows of the creators touched since the last refresh
+  const refreshStaleCreators = async () => {
+    liveRefreshTimer = null;
+    const addresses = [...staleCreators];
+    staleCreators.clear();
+    fetchStats();
+    if (!addresses.length) return;
+    try {
+      const params = new URLSearchParams({ creators: addresses.join(',') });
+      const response = await fetch(`${API_BASE_URL}/api/v1/creators?${params}`);
+      const rows = new Map((await response.json()).map(creator => [creator.creator_address, creatorRow(creator)]));
+      const apply = list => list.map(c => rows.has(c.address) ? { ...c, ...rows.get(c.address) } : c);
+      setCreators(apply);
+      setFilteredCreators(apply);
+    } catch (error) {
+      console.error('Error refreshing creators:', error);
+    }
+  };
 
-    ws = new WebSocket(`${import.meta.env.VITE_BACKEND_URL.replace(/^http/, 'ws')}/ws/tokens`);
-    
-    ws.onmessage = (event) => {
+  const markCreatorStale = (address) => {
+    if (address) staleCreators.add(address);
+    if (!liveRefreshTimer) liveRefreshTimer = setTimeout(refreshStaleCreators, LIVE_REFRESH_DELAY_MS);
+  };
+
+  // Subscribe to the server's live event stream
+  const initEventStream = () => {
+    if (eventSource) return;
+
+    eventSource = new EventSource(`${API_BASE_URL}/api/v1/events`);
+
+    eventSource.onmessage = (event) => {
       const data = JSON.parse(event.data);
       if (data.type === 'new_token') {
-        
         setCreators(prev => {
-          const updatedCreators = [...prev];
-          const creatorIndex = updatedCreators.findIndex(c => c.address === data.creator_address);
-          
-          if (creatorIndex !== -1) {
-            updatedCreators[creatorIndex].tokens.push(data.token);
-            updatedCreators[creatorIndex].token_count += 1;
-            updatedCreators[creatorIndex].latest_token_date = data.token.created_at;
-          } else {
-            
-            updatedCreators.unshift({
+          const creator = prev.find(c => c.address === data.creator_address);
+          if (!creator) {
+            return [{
               address: data.creator_address,
               name: data.creator_name,
               tokens: [data.token],
+              tokensComplete: true,
               token_count: 1,
               total_market_cap: data.token.market_cap,
+              total_replies: data.token.comments || 0,
               first_token_date: data.token.created_at,
               latest_token_date: data.token.created_at
-            });
+            }, ...prev];
           }
-          
-          return updatedCreators;
+          // Only a loaded list gets the token; an unloaded one fetches it on
+          // expand. Totals are refetched below.
+          const loaded = creator.tokens.length > 0 || creator.tokensComplete;
+          if (!loaded || creator.tokens.some(t => t.id === data.token.id)) return prev;
+          return prev.map(c => c === creator ? { ...c, tokens: [data.token, ...c.tokens] } : c);
         });
+        markCreatorStale(data.creator_address);
 
-        
         showNotification(`New token: ${data.token.ticker} by ${data.creator_name}`);
+      } else if (data.type === 'market_cap') {
+        setCreators(prev => prev.map(creator => {
+          if (!creator.tokens.some(t => t.id === data.id)) return creator;
+          return {
+            ...creator,
+            tokens: creator.tokens.map(t => t.id === data.id ? { ...t, market_cap: data.market_cap, comments: data.comments } : t)
+          };
+        }));
+        markCreatorStale(data.creator_address);
+      } else if (data.type === 'resync') {
+        // The stream dropped events while this tab lagged behind
+        fetchStats();
+        fetchCreators(sortBy, orderBy);
       }
     };
 
-    ws.onerror = (error) => {
-      console.error('WebSocket error:', error);
-    };
-
-    ws.onclose = () => {
-      console.log('WebSocket disconnected. Reconnecting...');
-      setTimeout(initWebSocket, 5000);
+    // The browser reconnects with Last-Event-ID and the server replays what
+    // was missed; only a stream it gave up on has to be reopened here.
+    eventSource.onerror = (error) => {
+      console.error('Event stream error, reconnecting:', error);
+      if (eventSource.readyState === EventSource.CLOSED) {
+        eventSource = null;
+        setTimeout(initEventStream, 5000);
+      }
     };
   };
 
@@ -197,21 +278,36 @@ const fetchCreators = async (sortByParam = sortBy, orderByParam = orderBy) => {
     }, 5000);
   };
 
-  // Search and filter creators
+  // Search and filter creators. Matching runs server-side on the search
+  // index; creators with a matching name, address or token are kept.
   useEffect(() => {
-    let filtered = creators;
-
-    if (searchTerm) {
-      filtered = filtered.filter(creator =>
-        creator.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        creator.address.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        creator.tokens.some(token => 
-          token.ticker.toLowerCase().includes(searchTerm.toLowerCase())
-        )
-      );
+    if (!searchTerm.trim()) {
+      setFilteredCreators(creators);
+      return;
     }
 
-    setFilteredCreators(filtered);
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ q: searchTerm, limit: '100' });
+        const response = await fetch(`${API_BASE_URL}/api/v1/search?${params}`, { signal: controller.signal });
+        const results = await response.json();
+        const addresses = new Set([
+          ...results.creators.map(creator => creator.creator_address),
+          ...results.tokens.map(token => token.creator_address)
+        ]);
+        setFilteredCreators(creators.filter(creator => addresses.has(creator.address)));
+      } catch (error) {
+        if (error.name !== 'AbortError') {
+          console.error('Search failed:', error);
+        }
+      }
+    }, 200);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
   }, [searchTerm, creators]);
 
   // Initialize dashboard
@@ -221,16 +317,12 @@ const fetchCreators = async (sortByParam = sortBy, orderByParam = orderBy) => {
   fetchStats();
   fetchStatsHistory();
   fetchCreators('total_market_cap', 'desc');
-  initWebSocket();
-
-  const interval = setInterval(() => {
-    fetchStats();
-    fetchCreators(sortBy, orderBy); // explicitly maintain current sorting
-  }, 300000);
+  // Updates arrive over the event stream, so there is no polling interval
+  initEventStream();
 
   return () => {
-    clearInterval(interval);
-    if (ws) ws.close();
+    if (eventSource) eventSource.close();
+    eventSource = null;
   };
 }, []);
 
@@ -563,6 +655,15 @@ const handleSort = (column) => {
                             <ExternalLink size={12} className="ml-1" />
                           </a>
                         ))}
+                        {!creator.tokensComplete && creator.tokens.length < creator.token_count && (
+                          <button
+                            onClick={() => loadCreatorTokens(creator.address)}
+                            disabled={creator.tokensLoading}
+                            className="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-gray-100 text-gray-700 hover:bg-gray-200"
+                          >
+                            {creator.tokensLoading ? 'Loading...' : creator.tokens.length ? 'Load more' : 'Show tokens'}
+                          </button>
+                        )}
                       </div>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">